@@ -14,13 +14,13 @@ async def get_exercises(
     """Get list of available exercises with optional filters"""
     try:
         if search:
-            exercises = await exercise_library.search_exercises(search)
+            exercises = exercise_library.search_exercises(search)
         elif category:
-            exercises = await exercise_library.get_exercises_by_category(category)
+            exercises = exercise_library.get_exercises_by_category(category)
         elif difficulty:
-            exercises = await exercise_library.get_exercises_by_difficulty(difficulty)
+            exercises = exercise_library.get_exercises_by_difficulty(difficulty)
         else:
-            exercises = await exercise_library.get_all_exercises()
+            exercises = exercise_library.get_all_exercises()
         
         return exercises
         
@@ -31,7 +31,7 @@ async def get_exercises(
 async def get_exercise(exercise_name: str):
     """Get detailed exercise information by name"""
     try:
-        exercise = await exercise_library.get_exercise(exercise_name)
+        exercise = exercise_library.get_exercise(exercise_name)
         if not exercise:
             raise HTTPException(status_code=404, detail="Exercise not found")
         
@@ -67,7 +67,7 @@ async def create_exercise(exercise: Exercise):
     """Create a new exercise (admin functionality)"""
     try:
         # Check if exercise already exists
-        existing = await exercise_library.get_exercise(exercise.name)
+        existing = exercise_library.get_exercise(exercise.name)
         if existing:
             raise HTTPException(status_code=400, detail="Exercise already exists")
         
@@ -87,7 +87,7 @@ async def update_exercise(exercise_name: str, exercise: Exercise):
     """Update an existing exercise (admin functionality)"""
     try:
         # Check if exercise exists
-        existing = await exercise_library.get_exercise(exercise_name)
+        existing = exercise_library.get_exercise(exercise_name)
         if not existing:
             raise HTTPException(status_code=404, detail="Exercise not found")
         
@@ -107,7 +107,7 @@ async def delete_exercise(exercise_name: str):
     """Delete an exercise (admin functionality)"""
     try:
         # Check if exercise exists
-        existing = await exercise_library.get_exercise(exercise_name)
+        existing = exercise_library.get_exercise(exercise_name)
         if not existing:
             raise HTTPException(status_code=404, detail="Exercise not found")
         
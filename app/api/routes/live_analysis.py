@@ -180,13 +180,13 @@ async def process_video_frame(frame_data: dict, session_id: str, session):
             await connection_manager.send_error(session_id, "Invalid image data")
             return
         
-        logger.debug(f"Processing frame for session {session_id}, exercise: {session.exercise_name}")
+        logger.debug("Processing frame for session %s, exercise: %s", session_id, session.exercise_name)
         
         # Process frame with MediaPipe
         result = mediapipe_service.process_frame(frame, session.exercise_name, session_id)
         
         if result:
-            logger.debug(f"MediaPipe result for {session_id}: reps={result.rep_count}, accuracy={result.accuracy_score:.2f}")
+            logger.debug("MediaPipe result for %s: reps=%d, accuracy=%.2f", session_id, result.rep_count, result.accuracy_score)
             
             # Update session stats
             session.update_stats(result.rep_count, result.form_feedback, result.accuracy_score)
@@ -212,7 +212,7 @@ async def process_video_frame(frame_data: dict, session_id: str, session):
             if result.form_feedback:
                 await connection_manager.send_feedback(session_id, result.form_feedback)
         else:
-            logger.debug(f"No MediaPipe result for session {session_id} - no pose detected")
+            logger.debug("No MediaPipe result for session %s - no pose detected", session_id)
         
     except Exception as e:
         logger.error(f"Error processing video frame for session {session_id}: {e}")
@@ -39,6 +39,23 @@ class Settings(BaseSettings):
     CONFIDENCE_THRESHOLD: float = 0.5
     DETECTION_CONFIDENCE: float = 0.5
     TRACKING_CONFIDENCE: float = 0.5
+    MAX_TRACKED_SESSIONS: int = 10000  # Per-session analysis state kept in memory (least recently used is evicted)
+    SESSION_IDLE_TIMEOUT: int = 1800  # Seconds without frames before a session's state is dropped; 0 disables
+    POSE_MODEL_COMPLEXITY: int = 1  # 0 = Lite (edge/mobile), 1 = Full (server), 2 = Heavy
+    POSE_FRAME_SKIP_THRESHOLD: float = 1.5  # Mean pixel delta below which the last pose is reused; 0 disables
+    POSE_INFERENCE_MAX_WIDTH: int = 640  # Wider frames are downscaled for inference only (overlays stay full size); 0 disables
+    POSE_BACKEND: str = "mediapipe"  # mediapipe (CPU), mediapipe_gpu (Tasks GPU delegate) or onnx
+    POSE_TASK_MODEL_PATH: Optional[str] = None  # pose_landmarker_*.task bundle for POSE_BACKEND=mediapipe_gpu
+    POSE_ONNX_MODEL_PATH: Optional[str] = None  # BlazePose landmark model for POSE_BACKEND=onnx
+    POSE_ONNX_PROVIDERS: str = "CUDAExecutionProvider,CPUExecutionProvider"
+    POSE_ONNX_INTRA_OP_THREADS: int = 0  # 0 = half the CPU cores (used by the CPU provider, e.g. for INT8 models)
+    POSE_TRT_PRECISION: str = "fp16"  # fp32, fp16 or int8, when TensorrtExecutionProvider is in POSE_ONNX_PROVIDERS
+    POSE_TRT_CACHE_DIR: str = "trt_engines"
+    POSE_TRT_INT8_CALIBRATION_TABLE: Optional[str] = None  # Required for int8
+    
+    # Annotated video export
+    ANNOTATION_INFER_FPS: int = 15  # Pose inference rate when annotating videos (other frames reuse the last pose); 0 = every frame
+    VIDEO_ENCODER: str = "auto"  # auto (first working hardware H.264 encoder, else libx264), h264_nvenc, h264_qsv, h264_amf or libx264
     
     class Config:
         env_file = ".env"
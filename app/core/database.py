@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 from app.core.config import settings
 import logging
 
@@ -60,6 +61,19 @@ async def create_indexes():
         
     except Exception as e:
         logger.error(f"Error creating indexes: {e}")
+    
+    # Exercises collection indexes (unique name keeps concurrent default seeding idempotent).
+    # Created last and on its own: databases seeded before this index may already hold
+    # duplicate names, and that failure must not skip the other indexes.
+    try:
+        await db.database.exercises.create_index("name", unique=True)
+    except DuplicateKeyError as e:
+        logger.error(
+            f"Could not create unique index on exercises.name because the collection has duplicate "
+            f"exercise names; remove the duplicates so concurrent seeding stays idempotent: {e}"
+        )
+    except Exception as e:
+        logger.error(f"Error creating exercises index: {e}")
 
 def get_database():
     """Get database instance"""
@@ -15,6 +15,7 @@ from app.core.init_demo_user import create_demo_user
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    # Load the exercise library eagerly; request handlers assume it is ready
     await exercise_library.initialize()
     # Initialize demo user for testing
     await create_demo_user()
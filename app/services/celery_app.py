@@ -22,8 +22,9 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
-    worker_prefetch_multiplier=1,
+    worker_prefetch_multiplier=1,  # Video workers; light-queue workers override via --prefetch-multiplier
     worker_max_tasks_per_child=1000,
+    worker_max_memory_per_child=1_500_000,  # KB (~1.5 GB); recycle workers leaking native memory
 )
 
 # Task routing
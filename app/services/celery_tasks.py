@@ -1,13 +1,68 @@
 from celery import current_task
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.services.celery_app import celery_app
 from app.services.video_processor_fixed import video_processor_fixed as video_processor
 from app.core.database import get_database
+from app.core.config import settings
 from bson import ObjectId
+import functools
+import json
 import logging
 import asyncio
+import redis
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional; fall back to the default asyncio loop
+    uvloop = None
 
 logger = logging.getLogger(__name__)
 
+# One event loop per worker process, reused across tasks
+_LOOP = None
+
+@worker_process_init.connect
+def _init_worker_loop(**kwargs):
+    """Create the persistent event loop when a worker process starts"""
+    global _LOOP
+    _LOOP = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    asyncio.set_event_loop(_LOOP)
+
+@worker_process_shutdown.connect
+def _close_worker_loop(**kwargs):
+    """Close the persistent event loop when a worker process exits"""
+    global _LOOP
+    if _LOOP is not None and not _LOOP.is_closed():
+        _LOOP.close()
+    _LOOP = None
+
+def _get_loop():
+    """Get the worker event loop (created lazily for non-prefork pools)"""
+    if _LOOP is None or _LOOP.is_closed():
+        _init_worker_loop()
+    return _LOOP
+
+# Progress is published here so clients can subscribe instead of polling AsyncResult
+PROGRESS_CHANNEL = "task_progress:{session_id}"
+_redis_client = None
+
+def _get_redis():
+    """Get the shared Redis client used for progress publishing"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+def _report_progress(task, session_id: str, progress: int, status: str):
+    """Update task state and publish the progress event for subscribers"""
+    meta = {'progress': progress, 'status': status}
+    task.update_state(state='PROGRESS', meta=meta)
+    
+    try:
+        _get_redis().publish(PROGRESS_CHANNEL.format(session_id=session_id), json.dumps(meta))
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish progress for session {session_id}: {e}")
+
 @celery_app.task(bind=True, name='app.services.celery_tasks.process_video_task')
 def process_video_task(self, session_id: str, video_url: str, exercise_name: str, user_id: str):
     """
@@ -19,78 +74,61 @@ def process_video_task(self, session_id: str, video_url: str, exercise_name: str
         logger.info(f"   User ID: {user_id}")
         
         # Update task status immediately
-        self.update_state(
-            state='PROGRESS',
-            meta={'progress': 5, 'status': 'Task started - initializing video analysis...'}
-        )
+        _report_progress(self, session_id, 5, 'Task started - initializing video analysis...')
         
         # Process video using async function in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        loop = _get_loop()
         
-        try:
-            logger.info(f"📥 Starting video download and processing...")
-            
-            # Update progress
-            self.update_state(
-                state='PROGRESS',
-                meta={'progress': 10, 'status': 'Downloading video for analysis...'}
-            )
-            
-            # Process the video (WITHOUT annotation for now to fix core issues)
-            result = loop.run_until_complete(
-                video_processor.process_video_from_url(
-                    video_url, 
-                    exercise_name, 
-                    session_id,
-                    generate_annotated=False  # Disable annotation temporarily
-                )
-            )
-            
-            logger.info(f"✅ Video processing completed successfully")
-            
-            # Update progress
-            self.update_state(
-                state='PROGRESS',
-                meta={'progress': 90, 'status': 'Saving analysis results...'}
-            )
-            
-            # Save results to database
-            loop.run_until_complete(
-                _save_analysis_results(session_id, result)
-            )
-            
-            # Generate summary
-            summary = loop.run_until_complete(
-                video_processor.generate_analysis_summary(result)
+        logger.info(f"📥 Starting video download and processing...")
+        
+        # Update progress
+        _report_progress(self, session_id, 10, 'Downloading video for analysis...')
+        
+        # Process the video (WITHOUT annotation for now to fix core issues)
+        result = loop.run_until_complete(
+            video_processor.process_video_from_url(
+                video_url, 
+                exercise_name, 
+                session_id,
+                generate_annotated=False  # Disable annotation temporarily
             )
-            
-            logger.info(f"🎉 Video processing completed for session {session_id}")
-            
-            return {
-                'status': 'completed',
-                'progress': 100,
-                'session_id': session_id,
-                'results': result.to_dict(),
-                'summary': summary
-            }
-            
-        finally:
-            loop.close()
-            
+        )
+        
+        logger.info(f"✅ Video processing completed successfully")
+        
+        # Update progress
+        _report_progress(self, session_id, 90, 'Saving analysis results...')
+        
+        # Save results to database
+        loop.run_until_complete(
+            _save_analysis_results(session_id, result)
+        )
+        
+        # Generate summary
+        summary = loop.run_until_complete(
+            video_processor.generate_analysis_summary(result)
+        )
+        
+        logger.info(f"🎉 Video processing completed for session {session_id}")
+        
+        return {
+            'status': 'completed',
+            'progress': 100,
+            'session_id': session_id,
+            'results': result.to_dict(),
+            'summary': summary
+        }
+        
     except Exception as e:
         logger.error(f"❌ Error in video processing task: {e}")
         
-        # Update database with error status
+        # Update database with error status on the shared worker loop
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(
+            _get_loop().run_until_complete(
                 _update_session_error(session_id, str(e))
             )
-            loop.close()
-        except:
-            pass
+        except Exception as update_error:
+            logger.error(f"Error recording failure for session {session_id}: {update_error}")
         
         self.update_state(
             state='FAILURE',
@@ -110,18 +148,12 @@ def generate_report_task(self, session_id: str):
     try:
         logger.info(f"Starting report generation for session {session_id}")
         
-        self.update_state(
-            state='PROGRESS',
-            meta={'progress': 0, 'status': 'Generating PDF report...'}
-        )
+        _report_progress(self, session_id, 0, 'Generating PDF report...')
         
         # TODO: Implement PDF report generation with ReportLab
         # This is a placeholder for now
         
-        self.update_state(
-            state='PROGRESS',
-            meta={'progress': 100, 'status': 'Report generated successfully'}
-        )
+        _report_progress(self, session_id, 100, 'Report generated successfully')
         
         return {
             'status': 'completed',
@@ -137,13 +169,18 @@ def generate_report_task(self, session_id: str):
         )
         raise
 
+@functools.lru_cache(maxsize=4096)
+def _sid_to_oid(session_id: str) -> ObjectId:
+    """Map a session UUID to the ObjectId used as its workout _id"""
+    return ObjectId(session_id.replace('-', '')[:24])
+
 async def _save_analysis_results(session_id: str, result):
     """Save analysis results to database"""
     try:
         db = get_database()
         if db is not None:
             # Convert session_id to ObjectId format
-            object_id = ObjectId(session_id.replace('-', '')[:24])
+            object_id = _sid_to_oid(session_id)
             
             # Update workout session with results
             update_data = result.to_dict()
@@ -164,7 +201,7 @@ async def _update_session_error(session_id: str, error_message: str):
     try:
         db = get_database()
         if db is not None:
-            object_id = ObjectId(session_id.replace('-', '')[:24])
+            object_id = _sid_to_oid(session_id)
             
             await db.workouts.update_one(
                 {"_id": object_id},
@@ -1,13 +1,161 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.models.workout import Exercise
 from app.core.database import get_database
+from pymongo.errors import BulkWriteError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Default exercise definitions, built once at import time
+_DEFAULT_EXERCISES = (
+    Exercise(
+        name="push_ups",
+        category="upper_body",
+        description="Classic upper body exercise targeting chest, triceps, and shoulders",
+        instructions=[
+            "Start in a plank position with hands shoulder-width apart",
+            "Lower your body until your chest nearly touches the ground",
+            "Keep your body in a straight line from head to heels",
+            "Push back up to the starting position",
+            "Repeat for desired number of repetitions"
+        ],
+        target_muscles=["chest", "triceps", "shoulders", "core"],
+        difficulty_level="beginner",
+        equipment_needed=[],
+        key_landmarks=[
+            "left_shoulder", "right_shoulder", 
+            "left_elbow", "right_elbow",
+            "left_wrist", "right_wrist",
+            "left_hip", "right_hip"
+        ],
+        form_rules={
+            "min_elbow_angle": 70,
+            "max_elbow_angle": 170,
+            "max_elbow_flare": 45,
+            "body_alignment_threshold": 0.1
+        }
+    ),
+    Exercise(
+        name="squats",
+        category="lower_body",
+        description="Fundamental lower body exercise targeting quadriceps, glutes, and hamstrings",
+        instructions=[
+            "Stand with feet shoulder-width apart",
+            "Lower your body by bending at the hips and knees",
+            "Keep your chest up and back straight",
+            "Descend until thighs are parallel to the ground",
+            "Push through your heels to return to starting position"
+        ],
+        target_muscles=["quadriceps", "glutes", "hamstrings", "calves"],
+        difficulty_level="beginner",
+        equipment_needed=[],
+        key_landmarks=[
+            "left_hip", "right_hip",
+            "left_knee", "right_knee",
+            "left_ankle", "right_ankle",
+            "left_shoulder", "right_shoulder"
+        ],
+        form_rules={
+            "min_knee_angle": 70,
+            "max_knee_angle": 170,
+            "knee_alignment_threshold": 0.05,
+            "depth_threshold": 90
+        }
+    ),
+    Exercise(
+        name="bicep_curls",
+        category="upper_body",
+        description="Isolation exercise targeting the biceps muscles",
+        instructions=[
+            "Stand with feet shoulder-width apart",
+            "Hold weights with arms at your sides",
+            "Keep elbows close to your torso",
+            "Curl the weights up by contracting your biceps",
+            "Lower the weights back to starting position with control"
+        ],
+        target_muscles=["biceps", "forearms"],
+        difficulty_level="beginner",
+        equipment_needed=["dumbbells"],
+        key_landmarks=[
+            "right_shoulder", "right_elbow", "right_wrist",
+            "left_shoulder", "left_elbow", "left_wrist"
+        ],
+        form_rules={
+            "min_elbow_angle": 30,
+            "max_elbow_angle": 170,
+            "elbow_stability_threshold": 0.1,
+            "full_rom_angle": 45
+        }
+    ),
+    Exercise(
+        name="lunges",
+        category="lower_body",
+        description="Unilateral lower body exercise for leg strength and balance",
+        instructions=[
+            "Stand with feet hip-width apart",
+            "Step forward with one leg",
+            "Lower your hips until both knees are bent at 90 degrees",
+            "Keep your front knee over your ankle",
+            "Push back to starting position and repeat"
+        ],
+        target_muscles=["quadriceps", "glutes", "hamstrings", "calves"],
+        difficulty_level="intermediate",
+        equipment_needed=[],
+        key_landmarks=[
+            "left_hip", "right_hip",
+            "left_knee", "right_knee",
+            "left_ankle", "right_ankle"
+        ],
+        form_rules={
+            "min_knee_angle": 70,
+            "max_knee_angle": 170,
+            "knee_over_ankle": True,
+            "hip_level_threshold": 0.1
+        }
+    ),
+    Exercise(
+        name="planks",
+        category="core",
+        description="Isometric core strengthening exercise",
+        instructions=[
+            "Start in a push-up position",
+            "Lower onto your forearms",
+            "Keep your body in a straight line",
+            "Engage your core muscles",
+            "Hold the position for desired duration"
+        ],
+        target_muscles=["core", "shoulders", "glutes"],
+        difficulty_level="beginner",
+        equipment_needed=[],
+        key_landmarks=[
+            "left_shoulder", "right_shoulder",
+            "left_hip", "right_hip",
+            "left_ankle", "right_ankle"
+        ],
+        form_rules={
+            "body_alignment_threshold": 0.05,
+            "hip_sag_threshold": 0.1,
+            "shoulder_stability": True
+        }
+    )
+)
+
+_DIFFICULTY_LEVELS = ("beginner", "intermediate", "advanced")
+
+# Pre-serialized documents for seeding the exercises collection
+_DEFAULT_EXERCISE_DICTS = [ex.model_dump(by_alias=True) for ex in _DEFAULT_EXERCISES]
+
 class ExerciseLibraryService:
     def __init__(self):
         self.exercises_cache = {}
+        # Secondary indexes over exercises_cache
+        self._by_category: Dict[str, Tuple[Exercise, ...]] = {}
+        self._by_difficulty: Dict[str, Tuple[Exercise, ...]] = {}
+        # Memoized read-only views, reset whenever the cache changes
+        self._all_exercises_cached: Optional[Tuple[Exercise, ...]] = None
+        self._categories_cached: Optional[Tuple[str, ...]] = None
+        # Lowercased name/description/muscles per cached exercise
+        self._search_blobs: Dict[str, str] = {}
         self.initialized = False
     
     async def initialize(self):
@@ -22,14 +170,12 @@ class ExerciseLibraryService:
                 self._initialize_memory_library()
                 return
             
-            # Check if exercises already exist
-            existing_count = await db.exercises.count_documents({})
+            # Check if exercises already exist (collection metadata, no scan)
+            existing_count = await db.exercises.estimated_document_count()
             
             if existing_count == 0:
                 # Insert default exercises
-                default_exercises = self._get_default_exercises()
-                await db.exercises.insert_many([ex.dict(by_alias=True) for ex in default_exercises])
-                logger.info(f"Inserted {len(default_exercises)} default exercises")
+                await self._insert_default_exercises(db)
             
             # Load exercises into cache
             await self._load_exercises_cache()
@@ -39,11 +185,22 @@ class ExerciseLibraryService:
             logger.error(f"Error initializing exercise library: {e}")
             self._initialize_memory_library()
     
+    async def _insert_default_exercises(self, db):
+        """Seed default exercises, skipping any that already exist"""
+        try:
+            await db.exercises.insert_many(_DEFAULT_EXERCISE_DICTS, ordered=False)
+            logger.info(f"Inserted {len(_DEFAULT_EXERCISE_DICTS)} default exercises")
+        except BulkWriteError as e:
+            # Duplicate keys (E11000) just mean the exercise is already seeded
+            write_errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in write_errors):
+                raise
+            logger.info(f"Inserted {e.details.get('nInserted', 0)} default exercises ({len(write_errors)} already present)")
+    
     def _initialize_memory_library(self):
         """Initialize in-memory exercise library as fallback"""
-        exercises = self._get_default_exercises()
-        for exercise in exercises:
-            self.exercises_cache[exercise.name] = exercise
+        for exercise in _DEFAULT_EXERCISES:
+            self._cache_exercise(exercise)
         self.initialized = True
         logger.info("Initialized in-memory exercise library")
     
@@ -54,204 +211,92 @@ class ExerciseLibraryService:
             return
         
         try:
-            cursor = db.exercises.find({})
-            async for doc in cursor:
-                exercise = Exercise(**doc)
-                self.exercises_cache[exercise.name] = exercise
+            docs = await db.exercises.find({}, batch_size=1000).to_list(length=None)
+            for doc in docs:
+                # Documents were validated before insertion, so skip re-validation
+                self._cache_exercise(Exercise.model_construct(**doc))
             
             logger.info(f"Loaded {len(self.exercises_cache)} exercises into cache")
             
         except Exception as e:
             logger.error(f"Error loading exercises cache: {e}")
     
+    def _cache_exercise(self, exercise: Exercise, key: Optional[str] = None):
+        """Add exercise to the cache and its secondary indexes"""
+        key = key or exercise.name
+        self._uncache_exercise(key)
+        
+        self.exercises_cache[key] = exercise
+        self._by_category[exercise.category] = self._by_category.get(exercise.category, ()) + (exercise,)
+        self._by_difficulty[exercise.difficulty_level] = self._by_difficulty.get(exercise.difficulty_level, ()) + (exercise,)
+        self._invalidate_views()
+        self._search_blobs[key] = "\n".join([exercise.name, exercise.description, *exercise.target_muscles]).lower()
+    
+    def _uncache_exercise(self, key: str):
+        """Remove exercise from the cache and its secondary indexes"""
+        exercise = self.exercises_cache.pop(key, None)
+        if exercise is None:
+            return
+        
+        self._search_blobs.pop(key, None)
+        self._remove_from_index(self._by_category, exercise.category, exercise)
+        self._remove_from_index(self._by_difficulty, exercise.difficulty_level, exercise)
+        self._invalidate_views()
+    
+    def _invalidate_views(self):
+        """Drop memoized views after the cache changes"""
+        self._all_exercises_cached = None
+        self._categories_cached = None
+    
+    @staticmethod
+    def _remove_from_index(index: Dict[str, Tuple[Exercise, ...]], bucket_key: str, exercise: Exercise):
+        """Remove exercise from an index bucket, dropping the bucket when empty"""
+        bucket = tuple(ex for ex in index.get(bucket_key, ()) if ex is not exercise)
+        if bucket:
+            index[bucket_key] = bucket
+        else:
+            index.pop(bucket_key, None)
+    
     def _get_default_exercises(self) -> List[Exercise]:
         """Get default exercise definitions"""
-        return [
-            Exercise(
-                name="push_ups",
-                category="upper_body",
-                description="Classic upper body exercise targeting chest, triceps, and shoulders",
-                instructions=[
-                    "Start in a plank position with hands shoulder-width apart",
-                    "Lower your body until your chest nearly touches the ground",
-                    "Keep your body in a straight line from head to heels",
-                    "Push back up to the starting position",
-                    "Repeat for desired number of repetitions"
-                ],
-                target_muscles=["chest", "triceps", "shoulders", "core"],
-                difficulty_level="beginner",
-                equipment_needed=[],
-                key_landmarks=[
-                    "left_shoulder", "right_shoulder", 
-                    "left_elbow", "right_elbow",
-                    "left_wrist", "right_wrist",
-                    "left_hip", "right_hip"
-                ],
-                form_rules={
-                    "min_elbow_angle": 70,
-                    "max_elbow_angle": 170,
-                    "max_elbow_flare": 45,
-                    "body_alignment_threshold": 0.1
-                }
-            ),
-            Exercise(
-                name="squats",
-                category="lower_body",
-                description="Fundamental lower body exercise targeting quadriceps, glutes, and hamstrings",
-                instructions=[
-                    "Stand with feet shoulder-width apart",
-                    "Lower your body by bending at the hips and knees",
-                    "Keep your chest up and back straight",
-                    "Descend until thighs are parallel to the ground",
-                    "Push through your heels to return to starting position"
-                ],
-                target_muscles=["quadriceps", "glutes", "hamstrings", "calves"],
-                difficulty_level="beginner",
-                equipment_needed=[],
-                key_landmarks=[
-                    "left_hip", "right_hip",
-                    "left_knee", "right_knee",
-                    "left_ankle", "right_ankle",
-                    "left_shoulder", "right_shoulder"
-                ],
-                form_rules={
-                    "min_knee_angle": 70,
-                    "max_knee_angle": 170,
-                    "knee_alignment_threshold": 0.05,
-                    "depth_threshold": 90
-                }
-            ),
-            Exercise(
-                name="bicep_curls",
-                category="upper_body",
-                description="Isolation exercise targeting the biceps muscles",
-                instructions=[
-                    "Stand with feet shoulder-width apart",
-                    "Hold weights with arms at your sides",
-                    "Keep elbows close to your torso",
-                    "Curl the weights up by contracting your biceps",
-                    "Lower the weights back to starting position with control"
-                ],
-                target_muscles=["biceps", "forearms"],
-                difficulty_level="beginner",
-                equipment_needed=["dumbbells"],
-                key_landmarks=[
-                    "right_shoulder", "right_elbow", "right_wrist",
-                    "left_shoulder", "left_elbow", "left_wrist"
-                ],
-                form_rules={
-                    "min_elbow_angle": 30,
-                    "max_elbow_angle": 170,
-                    "elbow_stability_threshold": 0.1,
-                    "full_rom_angle": 45
-                }
-            ),
-            Exercise(
-                name="lunges",
-                category="lower_body",
-                description="Unilateral lower body exercise for leg strength and balance",
-                instructions=[
-                    "Stand with feet hip-width apart",
-                    "Step forward with one leg",
-                    "Lower your hips until both knees are bent at 90 degrees",
-                    "Keep your front knee over your ankle",
-                    "Push back to starting position and repeat"
-                ],
-                target_muscles=["quadriceps", "glutes", "hamstrings", "calves"],
-                difficulty_level="intermediate",
-                equipment_needed=[],
-                key_landmarks=[
-                    "left_hip", "right_hip",
-                    "left_knee", "right_knee",
-                    "left_ankle", "right_ankle"
-                ],
-                form_rules={
-                    "min_knee_angle": 70,
-                    "max_knee_angle": 170,
-                    "knee_over_ankle": True,
-                    "hip_level_threshold": 0.1
-                }
-            ),
-            Exercise(
-                name="planks",
-                category="core",
-                description="Isometric core strengthening exercise",
-                instructions=[
-                    "Start in a push-up position",
-                    "Lower onto your forearms",
-                    "Keep your body in a straight line",
-                    "Engage your core muscles",
-                    "Hold the position for desired duration"
-                ],
-                target_muscles=["core", "shoulders", "glutes"],
-                difficulty_level="beginner",
-                equipment_needed=[],
-                key_landmarks=[
-                    "left_shoulder", "right_shoulder",
-                    "left_hip", "right_hip",
-                    "left_ankle", "right_ankle"
-                ],
-                form_rules={
-                    "body_alignment_threshold": 0.05,
-                    "hip_sag_threshold": 0.1,
-                    "shoulder_stability": True
-                }
-            )
-        ]
+        return list(_DEFAULT_EXERCISES)
     
-    async def get_exercise(self, exercise_name: str) -> Optional[Exercise]:
+    def get_exercise(self, exercise_name: str) -> Optional[Exercise]:
         """Get exercise by name"""
-        if not self.initialized:
-            await self.initialize()
-        
         return self.exercises_cache.get(exercise_name)
     
-    async def get_all_exercises(self) -> List[Exercise]:
+    def get_all_exercises(self) -> Tuple[Exercise, ...]:
         """Get all available exercises"""
-        if not self.initialized:
-            await self.initialize()
-        
-        return list(self.exercises_cache.values())
+        if self._all_exercises_cached is None:
+            self._all_exercises_cached = tuple(self.exercises_cache.values())
+        return self._all_exercises_cached
     
-    async def get_exercises_by_category(self, category: str) -> List[Exercise]:
+    def get_exercises_by_category(self, category: str) -> Tuple[Exercise, ...]:
         """Get exercises filtered by category"""
-        if not self.initialized:
-            await self.initialize()
-        
-        return [ex for ex in self.exercises_cache.values() if ex.category == category]
+        return self._by_category.get(category, ())
     
-    async def get_exercises_by_difficulty(self, difficulty: str) -> List[Exercise]:
+    def get_exercises_by_difficulty(self, difficulty: str) -> Tuple[Exercise, ...]:
         """Get exercises filtered by difficulty level"""
-        if not self.initialized:
-            await self.initialize()
-        
-        return [ex for ex in self.exercises_cache.values() if ex.difficulty_level == difficulty]
+        return self._by_difficulty.get(difficulty, ())
     
-    async def search_exercises(self, query: str) -> List[Exercise]:
+    def search_exercises(self, query: str) -> List[Exercise]:
         """Search exercises by name or description"""
-        if not self.initialized:
-            await self.initialize()
-        
         query_lower = query.lower()
-        results = []
-        
-        for exercise in self.exercises_cache.values():
-            if (query_lower in exercise.name.lower() or 
-                query_lower in exercise.description.lower() or
-                any(query_lower in muscle.lower() for muscle in exercise.target_muscles)):
-                results.append(exercise)
-        
-        return results
+        return [
+            self.exercises_cache[name]
+            for name, blob in self._search_blobs.items()
+            if query_lower in blob
+        ]
     
     async def add_exercise(self, exercise: Exercise) -> bool:
         """Add new exercise to library"""
         try:
             db = get_database()
             if db is not None:
-                await db.exercises.insert_one(exercise.dict(by_alias=True))
+                await db.exercises.insert_one(exercise.model_dump(by_alias=True))
             
             # Add to cache
-            self.exercises_cache[exercise.name] = exercise
+            self._cache_exercise(exercise)
             logger.info(f"Added new exercise: {exercise.name}")
             return True
             
@@ -266,11 +311,11 @@ class ExerciseLibraryService:
             if db is not None:
                 await db.exercises.update_one(
                     {"name": exercise_name},
-                    {"$set": updated_exercise.dict(by_alias=True)}
+                    {"$set": updated_exercise.model_dump(by_alias=True)}
                 )
             
             # Update cache
-            self.exercises_cache[exercise_name] = updated_exercise
+            self._cache_exercise(updated_exercise, key=exercise_name)
             logger.info(f"Updated exercise: {exercise_name}")
             return True
             
@@ -286,8 +331,7 @@ class ExerciseLibraryService:
                 await db.exercises.delete_one({"name": exercise_name})
             
             # Remove from cache
-            if exercise_name in self.exercises_cache:
-                del self.exercises_cache[exercise_name]
+            self._uncache_exercise(exercise_name)
             
             logger.info(f"Deleted exercise: {exercise_name}")
             return True
@@ -296,20 +340,18 @@ class ExerciseLibraryService:
             logger.error(f"Error deleting exercise: {e}")
             return False
     
-    def get_exercise_categories(self) -> List[str]:
+    def get_exercise_categories(self) -> Tuple[str, ...]:
         """Get list of all exercise categories"""
         if not self.initialized:
-            return []
-        
-        categories = set()
-        for exercise in self.exercises_cache.values():
-            categories.add(exercise.category)
+            return ()
         
-        return sorted(list(categories))
+        if self._categories_cached is None:
+            self._categories_cached = tuple(sorted(self._by_category))
+        return self._categories_cached
     
-    def get_difficulty_levels(self) -> List[str]:
+    def get_difficulty_levels(self) -> Tuple[str, ...]:
         """Get list of all difficulty levels"""
-        return ["beginner", "intermediate", "advanced"]
+        return _DIFFICULTY_LEVELS
 
 # Global instance
 exercise_library = ExerciseLibraryService()
\ No newline at end of file
@@ -1,17 +1,21 @@
+import functools
 import os
 import pickle
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, BinaryIO
 import uuid
 import logging
 from datetime import datetime
-import mimetypes
 
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import AuthorizedSession, Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload, MediaFileUpload
 from googleapiclient.errors import HttpError
+from requests.adapters import HTTPAdapter
 
 from app.core.config import settings
 
@@ -20,10 +24,55 @@ logger = logging.getLogger(__name__)
 # Scopes required for Google Drive API
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
+# Refresh OAuth tokens this long before they expire
+TOKEN_REFRESH_MARGIN = 300  # seconds
+MIN_REFRESH_INTERVAL = 60  # seconds
+
+# Background uploads
+UPLOAD_WORKERS = 4
+UPLOAD_RETRIES = 3  # retried with exponential backoff on 429/5xx by googleapiclient
+
+# Resumable uploads send this much per request; smaller files go up in one request
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024
+
+# Largest page files().list accepts
+LIST_PAGE_SIZE = 1000
+
+# Video MIME types by extension (avoids initializing the mimetypes tables)
+_MIME_MAP = {
+    '.mp4': 'video/mp4',
+    '.m4v': 'video/x-m4v',
+    '.avi': 'video/x-msvideo',
+    '.mov': 'video/quicktime',
+    '.mkv': 'video/x-matroska',
+    '.webm': 'video/webm',
+    '.mpeg': 'video/mpeg',
+    '.mpg': 'video/mpeg',
+    '.3gp': 'video/3gpp',
+    '.wmv': 'video/x-ms-wmv',
+    '.flv': 'video/x-flv',
+    '.ogv': 'video/ogg',
+}
+
+# Keep-alive connection pool for direct (non-discovery) Drive HTTP calls
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 20
+HTTP_CONNECT_RETRIES = 3
+
+# Endpoint for starting resumable upload sessions that clients upload to directly
+RESUMABLE_SESSION_URL = 'https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable&fields=id,name'
+
 class GoogleDriveService:
     def __init__(self):
         self.service = None
         self.initialized = False
+        self._creds: Optional[Credentials] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+        # httplib2 is not thread-safe, so each thread gets its own Drive client
+        self._thread_local = threading.local()
+        self._http_session: Optional[AuthorizedSession] = None
+        self._upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="drive-upload")
         
     def initialize(self):
         """Initialize Google Drive API service"""
@@ -34,7 +83,11 @@ class GoogleDriveService:
             creds = self._get_credentials()
             if creds:
                 self.service = build('drive', 'v3', credentials=creds)
+                self._creds = creds
+                self._thread_local.service = self.service
+                self._http_session = self._build_http_session(creds)
                 self.initialized = True
+                self._start_refresh_thread()
                 logger.info("Google Drive service initialized successfully")
             else:
                 logger.error("Failed to get Google Drive credentials")
@@ -51,7 +104,7 @@ class GoogleDriveService:
         # Load existing token
         if os.path.exists(settings.GOOGLE_DRIVE_TOKEN_FILE):
             with open(settings.GOOGLE_DRIVE_TOKEN_FILE, 'rb') as token:
-                creds = pickle.load(token)
+                creds = pickle.loads(token.read())
         
         # If there are no (valid) credentials available, let the user log in
         if not creds or not creds.valid:
@@ -77,14 +130,70 @@ class GoogleDriveService:
                     return None
             
             # Save the credentials for the next run
-            try:
-                with open(settings.GOOGLE_DRIVE_TOKEN_FILE, 'wb') as token:
-                    pickle.dump(creds, token)
-            except Exception as e:
-                logger.error(f"Failed to save credentials: {e}")
+            self._save_credentials(creds)
         
         return creds
     
+    def _save_credentials(self, creds: Credentials):
+        """Persist credentials to the token file"""
+        try:
+            with open(settings.GOOGLE_DRIVE_TOKEN_FILE, 'wb') as token:
+                pickle.dump(creds, token, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.error(f"Failed to save credentials: {e}")
+    
+    def _get_service(self):
+        """Get the Drive client for the current thread"""
+        service = getattr(self._thread_local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self._creds, cache_discovery=False)
+            self._thread_local.service = service
+        return service
+    
+    def _build_http_session(self, creds: Credentials) -> AuthorizedSession:
+        """Build the shared, thread-safe session used for direct Drive HTTP calls"""
+        session = AuthorizedSession(creds)
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=HTTP_CONNECT_RETRIES
+        )
+        session.mount('https://', adapter)
+        return session
+    
+    def _start_refresh_thread(self):
+        """Start the background token refresher (once per process)"""
+        if self._refresh_thread is not None or not self._creds.refresh_token:
+            return
+        
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop,
+            name="drive-token-refresh",
+            daemon=True
+        )
+        self._refresh_thread.start()
+    
+    def _refresh_loop(self):
+        """Refresh the OAuth token shortly before it expires so uploads never wait on it"""
+        while True:
+            expiry = self._creds.expiry
+            if expiry:
+                delay = (expiry - datetime.utcnow()).total_seconds() - TOKEN_REFRESH_MARGIN
+            else:
+                delay = 0
+            time.sleep(max(MIN_REFRESH_INTERVAL, delay))
+            
+            # Not locked: the per-thread Drive clients and the shared HTTP session also refresh these
+            # credentials on their own (when expired or on a 401). Concurrent refreshes are tolerated:
+            # each fetches a new valid token and only replaces the token/expiry attributes, so the
+            # worst case is a redundant refresh.
+            try:
+                self._creds.refresh(Request())
+                self._save_credentials(self._creds)
+                logger.info("Google Drive credentials refreshed in background")
+            except Exception as e:
+                logger.warning(f"Background credential refresh failed: {e}")
+    
     def upload_video(self, file: BinaryIO, filename: str, user_id: str) -> Optional[str]:
         """
         Upload video file to Google Drive
@@ -110,14 +219,10 @@ class GoogleDriveService:
             unique_filename = f"{user_id}_{uuid.uuid4()}{file_extension}"
             
             # Prepare file metadata
-            file_metadata = {
-                'name': unique_filename,
-                'description': f'Workout video uploaded by user {user_id} on {datetime.utcnow().isoformat()}',
-            }
-            
-            # Add to specific folder if configured
-            if settings.GOOGLE_DRIVE_FOLDER_ID:
-                file_metadata['parents'] = [settings.GOOGLE_DRIVE_FOLDER_ID]
+            file_metadata = self._build_file_metadata(
+                unique_filename, user_id,
+                f'Workout video uploaded by user {user_id} on {datetime.utcnow().isoformat()}'
+            )
             
             # Determine MIME type
             mime_type = self._get_mime_type(file_extension)
@@ -126,15 +231,16 @@ class GoogleDriveService:
             media = MediaIoBaseUpload(
                 file, 
                 mimetype=mime_type,
-                resumable=True
+                chunksize=UPLOAD_CHUNK_SIZE,
+                resumable=self._use_resumable_upload(self._get_stream_size(file))
             )
             
             # Upload file
-            uploaded_file = self.service.files().create(
+            uploaded_file = self._get_service().files().create(
                 body=file_metadata,
                 media_body=media,
-                fields='id,name,webViewLink,webContentLink'
-            ).execute()
+                fields='id'  # The shareable URL is built from the id, so no links are needed
+            ).execute(num_retries=UPLOAD_RETRIES)
             
             # Make file publicly viewable
             file_id = uploaded_file.get('id')
@@ -178,27 +284,28 @@ class GoogleDriveService:
             unique_filename = f"{user_id}_{uuid.uuid4()}_processed{file_extension}"
             
             # Prepare file metadata
-            file_metadata = {
-                'name': unique_filename,
-                'description': f'Processed workout video for user {user_id} on {datetime.utcnow().isoformat()}',
-            }
-            
-            # Add to specific folder if configured
-            if settings.GOOGLE_DRIVE_FOLDER_ID:
-                file_metadata['parents'] = [settings.GOOGLE_DRIVE_FOLDER_ID]
+            file_metadata = self._build_file_metadata(
+                unique_filename, user_id,
+                f'Processed workout video for user {user_id} on {datetime.utcnow().isoformat()}'
+            )
             
             # Determine MIME type
             mime_type = self._get_mime_type(file_extension)
             
             # Create media upload object
-            media = MediaFileUpload(file_path, mimetype=mime_type, resumable=True)
+            media = MediaFileUpload(
+                file_path,
+                mimetype=mime_type,
+                chunksize=UPLOAD_CHUNK_SIZE,
+                resumable=self._use_resumable_upload(os.path.getsize(file_path))
+            )
             
             # Upload file
-            uploaded_file = self.service.files().create(
+            uploaded_file = self._get_service().files().create(
                 body=file_metadata,
                 media_body=media,
-                fields='id,name,webViewLink,webContentLink'
-            ).execute()
+                fields='id'  # The shareable URL is built from the id, so no links are needed
+            ).execute(num_retries=UPLOAD_RETRIES)
             
             # Make file publicly viewable
             file_id = uploaded_file.get('id')
@@ -217,6 +324,102 @@ class GoogleDriveService:
             logger.error(f"Failed to upload processed video: {e}")
             return None
     
+    def upload_async(self, file_path: str, original_filename: str, user_id: str) -> Future:
+        """
+        Upload processed video file on the background upload pool
+        
+        Args:
+            file_path: Local path to processed video file
+            original_filename: Original filename for reference
+            user_id: User ID for organizing files
+            
+        Returns:
+            Future resolving to the shareable URL (or None if the upload failed)
+        """
+        return self._upload_pool.submit(self.upload_processed_video, file_path, original_filename, user_id)
+    
+    def create_resumable_session(self, filename: str, user_id: str,
+                                 file_size: Optional[int] = None,
+                                 origin: Optional[str] = None) -> Optional[dict]:
+        """
+        Start a resumable upload session the client can upload to directly
+        
+        The client PUTs the video bytes to the returned upload URL (with
+        Content-Range headers for chunks), so they never pass through the app
+        server. Once Drive returns the file id, call finalize_client_upload.
+        
+        Args:
+            filename: Original filename
+            user_id: User ID for organizing files
+            file_size: Size of the video in bytes, if known
+            origin: Browser origin that will upload (required for CORS)
+            
+        Returns:
+            Dict with upload_url and filename, or None if failed
+        """
+        if not self.initialized:
+            self.initialize()
+            
+        if not self.service:
+            logger.error("Google Drive service not initialized")
+            return None
+            
+        try:
+            # Generate unique filename
+            file_extension = os.path.splitext(filename)[1]
+            unique_filename = f"{user_id}_{uuid.uuid4()}{file_extension}"
+            
+            # Prepare file metadata
+            file_metadata = self._build_file_metadata(
+                unique_filename, user_id,
+                f'Workout video uploaded by user {user_id} on {datetime.utcnow().isoformat()}'
+            )
+            
+            headers = {'X-Upload-Content-Type': self._get_mime_type(file_extension)}
+            if file_size is not None:
+                headers['X-Upload-Content-Length'] = str(file_size)
+            if origin:
+                headers['Origin'] = origin
+            
+            response = self._http_session.post(
+                RESUMABLE_SESSION_URL,
+                json=file_metadata,
+                headers=headers
+            )
+            response.raise_for_status()
+            
+            upload_url = response.headers.get('Location')
+            if not upload_url:
+                logger.error("Drive did not return a resumable session URL")
+                return None
+            
+            logger.info(f"Resumable upload session created: {unique_filename}")
+            return {'upload_url': upload_url, 'filename': unique_filename}
+            
+        except Exception as e:
+            logger.error(f"Failed to create resumable upload session: {e}")
+            return None
+    
+    def finalize_client_upload(self, file_id: str) -> Optional[str]:
+        """
+        Finish a client-direct upload started with create_resumable_session
+        
+        Args:
+            file_id: Google Drive file ID returned to the client by Drive
+            
+        Returns:
+            Shareable URL of uploaded file or None if failed
+        """
+        if not self.initialized:
+            self.initialize()
+            
+        if not self.service:
+            logger.error("Google Drive service not initialized")
+            return None
+        
+        self._make_file_public(file_id)
+        return self._get_shareable_url(file_id)
+    
     def delete_file(self, file_id: str) -> bool:
         """
         Delete file from Google Drive
@@ -235,7 +438,7 @@ class GoogleDriveService:
             return False
             
         try:
-            self.service.files().delete(fileId=file_id).execute()
+            self._get_service().files().delete(fileId=file_id).execute()
             logger.info(f"File deleted successfully: {file_id}")
             return True
             
@@ -264,18 +467,16 @@ class GoogleDriveService:
             return []
             
         try:
-            # Search for files with user_id in name
-            query = f"name contains '{user_id}' and mimeType contains 'video/'"
+            # Search for files tagged with the user_id (indexed by Drive, unlike a name substring match)
+            query = (
+                f"appProperties has {{ key='user_id' and value='{user_id}' }}"
+                f" and mimeType contains 'video/'"
+            )
             
             if settings.GOOGLE_DRIVE_FOLDER_ID:
                 query += f" and '{settings.GOOGLE_DRIVE_FOLDER_ID}' in parents"
             
-            results = self.service.files().list(
-                q=query,
-                fields="files(id,name,size,createdTime,webViewLink)"
-            ).execute()
-            
-            return results.get('files', [])
+            return list(self._iter_files(query, "files(id,name,size,createdTime,webViewLink)"))
             
         except HttpError as e:
             logger.error(f"Google Drive API error while listing: {e}")
@@ -302,7 +503,7 @@ class GoogleDriveService:
             return None
             
         try:
-            file_info = self.service.files().get(
+            file_info = self._get_service().files().get(
                 fileId=file_id,
                 fields="id,name,size,createdTime,modifiedTime,mimeType,webViewLink,webContentLink"
             ).execute()
@@ -316,6 +517,39 @@ class GoogleDriveService:
             logger.error(f"Failed to get file info: {e}")
             return None
     
+    def _build_file_metadata(self, name: str, user_id: str, description: str) -> dict:
+        """Build Drive metadata for a new video, tagged with the owning user"""
+        file_metadata = {
+            'name': name,
+            'description': description,
+            'appProperties': {'user_id': user_id},
+        }
+        
+        # Add to specific folder if configured
+        if settings.GOOGLE_DRIVE_FOLDER_ID:
+            file_metadata['parents'] = [settings.GOOGLE_DRIVE_FOLDER_ID]
+        
+        return file_metadata
+    
+    def _iter_files(self, query: str, files_fields: str):
+        """Yield every file matching the query, following nextPageToken across pages"""
+        service = self._get_service()
+        page_token = None
+        
+        while True:
+            response = service.files().list(
+                q=query,
+                pageSize=LIST_PAGE_SIZE,
+                pageToken=page_token,
+                fields=f"nextPageToken,{files_fields}"
+            ).execute()
+            
+            yield from response.get('files', [])
+            
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+    
     def _make_file_public(self, file_id: str):
         """Make file publicly viewable"""
         try:
@@ -323,33 +557,39 @@ class GoogleDriveService:
                 'role': 'reader',
                 'type': 'anyone'
             }
-            self.service.permissions().create(
+            self._get_service().permissions().create(
                 fileId=file_id,
-                body=permission
+                body=permission,
+                fields='id'
             ).execute()
         except Exception as e:
             logger.warning(f"Failed to make file public: {e}")
     
+    def _get_stream_size(self, file: BinaryIO) -> Optional[int]:
+        """Get the remaining size of a seekable stream, or None if unknown"""
+        try:
+            start = file.tell()
+            file.seek(0, os.SEEK_END)
+            size = file.tell() - start
+            file.seek(start)
+            return size
+        except (AttributeError, OSError):
+            return None
+    
+    def _use_resumable_upload(self, size: Optional[int]) -> bool:
+        """Resumable uploads cost extra round trips that only pay off for large files"""
+        return size is None or size >= RESUMABLE_UPLOAD_THRESHOLD
+    
     def _get_shareable_url(self, file_id: str) -> str:
         """Get shareable URL for the file"""
         # Return direct download link for videos
         return f"https://drive.google.com/uc?id={file_id}&export=download"
     
-    def _get_mime_type(self, file_extension: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _get_mime_type(file_extension: str) -> str:
         """Get MIME type based on file extension"""
-        mime_type, _ = mimetypes.guess_type(f"file{file_extension}")
-        if mime_type and mime_type.startswith('video/'):
-            return mime_type
-        
-        # Fallback to common video types
-        mime_types = {
-            '.mp4': 'video/mp4',
-            '.avi': 'video/x-msvideo',
-            '.mov': 'video/quicktime',
-            '.mkv': 'video/x-matroska',
-            '.webm': 'video/webm'
-        }
-        return mime_types.get(file_extension.lower(), 'video/mp4')
+        return _MIME_MAP.get(file_extension.lower(), 'video/mp4')
 
 # Global instance
 google_drive_storage = GoogleDriveService()
\ No newline at end of file
@@ -1,22 +1,386 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Final, List, NamedTuple, Optional, Tuple
 import logging
-from dataclasses import dataclass
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, field
+from enum import IntEnum
 import math
 
 from app.core.config import settings
+from app.services.onnx_pose_service import create_onnx_pose_landmarker, tensorrt_provider_options
+from app.services.pose_landmarker_service import create_task_pose_landmarker
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to the NumPy implementation
+    njit = None
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class PoseLandmark:
+# MediaPipe landmark indices
+LANDMARK_INDICES = {
+    'nose': 0,
+    'left_eye_inner': 1, 'left_eye': 2, 'left_eye_outer': 3,
+    'right_eye_inner': 4, 'right_eye': 5, 'right_eye_outer': 6,
+    'left_ear': 7, 'right_ear': 8,
+    'mouth_left': 9, 'mouth_right': 10,
+    'left_shoulder': 11, 'right_shoulder': 12,
+    'left_elbow': 13, 'right_elbow': 14,
+    'left_wrist': 15, 'right_wrist': 16,
+    'left_pinky': 17, 'right_pinky': 18,
+    'left_index': 19, 'right_index': 20,
+    'left_thumb': 21, 'right_thumb': 22,
+    'left_hip': 23, 'right_hip': 24,
+    'left_knee': 25, 'right_knee': 26,
+    'left_ankle': 27, 'right_ankle': 28,
+    'left_heel': 29, 'right_heel': 30,
+    'left_foot_index': 31, 'right_foot_index': 32
+}
+LANDMARK_ITEMS: Final = tuple(LANDMARK_INDICES.items())
+LANDMARK_NAMES: Final = tuple(sorted(LANDMARK_INDICES, key=LANDMARK_INDICES.get))  # Name by landmark id
+
+def _landmark_color(name: str) -> Tuple[int, int, int]:
+    """Drawing color for a landmark by body part (BGR)"""
+    if 'shoulder' in name or 'elbow' in name or 'wrist' in name:
+        return (255, 0, 0)  # Blue for arms
+    if 'hip' in name or 'knee' in name or 'ankle' in name:
+        return (0, 0, 255)  # Red for legs
+    return OTHER_LANDMARK_COLOR
+
+OTHER_LANDMARK_COLOR: Final = (255, 255, 0)  # Cyan for other points
+LANDMARK_COLORS: Final = {name: _landmark_color(name) for name in LANDMARK_INDICES}
+
+# Row index into the per-frame (N, 4) landmark array, e.g. points[LM.LEFT_SHOULDER, Y]
+LM = IntEnum('LM', {name.upper(): idx for name, idx in LANDMARK_INDICES.items()})
+
+# Column index into the per-frame landmark array
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+# Joint angles each analyzer needs: (point1, vertex, point3) landmark indices, computed in one batched call
+PUSHUP_TRIPLETS = np.array([
+    [11, 13, 15],  # left shoulder, elbow, wrist
+    [12, 14, 16],  # right shoulder, elbow, wrist
+    [11, 23, 27],  # left shoulder, hip, ankle (body line)
+])
+SQUAT_TRIPLETS = np.array([
+    [23, 25, 27],  # left hip, knee, ankle
+    [24, 26, 28],  # right hip, knee, ankle
+    [11, 23, 25],  # left shoulder, hip, knee
+])
+CURL_TRIPLETS = np.array([
+    [11, 13, 15],  # left shoulder, elbow, wrist
+    [12, 14, 16],  # right shoulder, elbow, wrist
+])
+
+def _joint_angles_numpy(points: np.ndarray, triplets: np.ndarray) -> np.ndarray:
+    """Angles (degrees) at the vertex of each (point1, vertex, point3) triplet"""
+    xyz = points[:, :3]
+    ba = xyz[triplets[:, 0]] - xyz[triplets[:, 1]]
+    bc = xyz[triplets[:, 2]] - xyz[triplets[:, 1]]
+    
+    cosine_angles = np.einsum('ij,ij->i', ba, bc) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1))
+    return np.degrees(np.arccos(np.clip(cosine_angles, -1.0, 1.0)))
+
+def _joint_angles_scalar(points: np.ndarray, triplets: np.ndarray) -> np.ndarray:
+    """Scalar-loop version of _joint_angles_numpy, compiled with numba when available"""
+    angles = np.empty(triplets.shape[0])
+    for i in range(triplets.shape[0]):
+        a, b, c = triplets[i, 0], triplets[i, 1], triplets[i, 2]
+        bax = points[a, 0] - points[b, 0]
+        bay = points[a, 1] - points[b, 1]
+        baz = points[a, 2] - points[b, 2]
+        bcx = points[c, 0] - points[b, 0]
+        bcy = points[c, 1] - points[b, 1]
+        bcz = points[c, 2] - points[b, 2]
+        
+        dot = bax * bcx + bay * bcy + baz * bcz
+        norm = math.sqrt(bax * bax + bay * bay + baz * baz) * math.sqrt(bcx * bcx + bcy * bcy + bcz * bcz)
+        if norm == 0.0:
+            # Degenerate triplet (coinciding landmarks): NaN like the NumPy path, since min/max would clamp NaN to -1
+            angles[i] = np.nan
+            continue
+        cosine = min(1.0, max(-1.0, dot / norm))
+        angles[i] = math.degrees(math.acos(cosine))
+    return angles
+
+if njit is not None:
+    # error_model='numpy' skips ZeroDivisionError checks on the division; degenerate triplets are handled explicitly
+    _joint_angles = njit(cache=True, error_model='numpy')(_joint_angles_scalar)
+else:
+    _joint_angles = _joint_angles_numpy
+
+# Pose detection/tracking confidence shared by every Pose instance
+POSE_MIN_CONFIDENCE: Final = 0.6
+
+# Push-up thresholds (elbow angles in degrees, distances in normalized image units)
+PUSHUP_UP_ANGLE: Final = 140.0         # Arms mostly extended
+PUSHUP_DOWN_ANGLE: Final = 80.0        # Arms bent at bottom
+PUSHUP_HYSTERESIS: Final = 10.0        # Prevent oscillation
+PUSHUP_MIN_STABLE_FRAMES: Final = 3
+PUSHUP_MIN_REP_FRAMES: Final = 20      # Minimum 2 seconds at 10 FPS
+PUSHUP_ELBOW_FLARE_MAX: Final = 1.6
+PUSHUP_ELBOW_FLARE_GOOD: Final = 1.3
+PUSHUP_BODY_ANGLE_MIN: Final = 150.0
+PUSHUP_BODY_ANGLE_MAX: Final = 210.0
+PUSHUP_SHALLOW_ANGLE: Final = 100.0
+PUSHUP_DEEP_ANGLE: Final = 60.0
+PUSHUP_HAND_OFFSET_MAX: Final = 0.15
+
+# Push-up feedback for REP_EVENT_START, REP_EVENT_DOWN and REP_EVENT_REP
+PUSHUP_REP_MESSAGES: Final = ("Starting position detected", "Going down", "Push-up {} completed!")
+
+# Squat thresholds
+SQUAT_UP_ANGLE: Final = 150.0          # Knees mostly straight
+SQUAT_DOWN_ANGLE: Final = 90.0         # Deep squat position
+SQUAT_HYSTERESIS: Final = 15.0         # Prevent oscillation
+SQUAT_MIN_STABLE_FRAMES: Final = 5
+SQUAT_MIN_REP_FRAMES: Final = 25       # Minimum 2.5 seconds at 10 FPS
+SQUAT_KNEE_OFFSET_MAX: Final = 0.08
+SQUAT_SHALLOW_ANGLE: Final = 110.0
+SQUAT_DEEP_ANGLE: Final = 70.0
+SQUAT_TORSO_ANGLE_MIN: Final = 60.0
+SQUAT_TORSO_ANGLE_MAX: Final = 120.0
+SQUAT_FEET_OFFSET_MAX: Final = 0.03
+
+SQUAT_REP_MESSAGES: Final = ("Standing position detected", "Squatting down", "Squat {} completed!")
+
+# Bicep curl thresholds
+CURL_EXTENDED_ANGLE: Final = 150.0     # Arm mostly straight
+CURL_CURLED_ANGLE: Final = 45.0        # Arm fully curled
+CURL_HYSTERESIS: Final = 10.0          # Prevent oscillation
+CURL_MIN_STABLE_FRAMES: Final = 3
+CURL_MIN_REP_FRAMES: Final = 15        # Minimum 1.5 seconds at 10 FPS
+CURL_ELBOW_DRIFT_MAX: Final = 0.12
+CURL_ELBOW_DROP_MAX: Final = 0.1
+CURL_SHALLOW_ANGLE: Final = 60.0
+CURL_FULL_ANGLE: Final = 30.0
+CURL_MAX_ANGLE_CHANGE: Final = 30.0    # Per frame; faster means an uncontrolled rep
+CURL_REP_MESSAGES: Final = ("Starting position detected", "Curling up", "Bicep curl {} completed!")
+
+# Landmarks each analyzer counts reps from, as alternative (left, right) groups: a frame is
+# analyzed when every landmark of at least one group is visible, otherwise the analyzer is skipped
+CRITICAL_LANDMARKS: Final = {
+    'push_ups': ((11, 13, 15), (12, 14, 16)),     # shoulder, elbow, wrist
+    'squats': ((23, 25, 27), (24, 26, 28)),       # hip, knee, ankle
+    'bicep_curls': ((11, 13, 15), (12, 14, 16)),  # shoulder, elbow, wrist
+}
+MIN_LANDMARK_VISIBILITY: Final = 0.5
+
+# Frames wider than this are downscaled before inference (MediaPipe resizes to 256x256 internally); 0 disables
+MAX_INFERENCE_WIDTH: Final = settings.POSE_INFERENCE_MAX_WIDTH
+
+# Frames sent to a pose worker per task when processing recorded videos
+VIDEO_CHUNK_SIZE = 64
+
+# Pose instance owned by each process_video worker process
+_worker_pose = None
+
+def _init_pose_worker(model_complexity: int):
+    global _worker_pose
+    _worker_pose = mp.solutions.pose.Pose(
+        static_image_mode=False,
+        model_complexity=model_complexity,
+        enable_segmentation=False,
+        min_detection_confidence=POSE_MIN_CONFIDENCE,
+        min_tracking_confidence=POSE_MIN_CONFIDENCE
+    )
+
+def _pose_landmarks_to_array(pose_landmarks) -> np.ndarray:
+    """Fill an (N, 4) x, y, z, visibility array straight from the landmark protobuf (no per-landmark tuples)"""
+    count = len(pose_landmarks.landmark)
+    values = itertools.chain.from_iterable(
+        (lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark
+    )
+    return np.fromiter(values, dtype=np.float64, count=count * 4).reshape(count, 4)
+
+def _downscale_for_inference(frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Shrink large frames so color conversion and copies touch less memory; landmarks are normalized
+    
+    Writes into dst when it already has the downscaled shape, so a caller can reuse one buffer.
+    """
+    height, width = frame.shape[:2]
+    if not MAX_INFERENCE_WIDTH or width <= MAX_INFERENCE_WIDTH:
+        return frame
+    scaled_height = max(1, int(height * MAX_INFERENCE_WIDTH / width))
+    if dst is not None and dst.shape != (scaled_height, MAX_INFERENCE_WIDTH) + frame.shape[2:]:
+        dst = None
+    return cv2.resize(frame, (MAX_INFERENCE_WIDTH, scaled_height), dst=dst, interpolation=cv2.INTER_AREA)
+
+def _pose_batch(frames: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+    """Detect landmarks for a chunk of consecutive BGR frames in a worker process"""
+    # Chunks arrive in any order, so do not track from the previous chunk's last frame
+    _worker_pose.reset()
+    
+    batch = []
+    for frame in frames:
+        # Frames are this worker's own unpickled copies, so swap channels in place
+        frame = _downscale_for_inference(frame)
+        results = _worker_pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame))
+        if results.pose_landmarks:
+            batch.append(_pose_landmarks_to_array(results.pose_landmarks))
+        else:
+            batch.append(None)
+    return batch
+
+def _read_frame_chunks(path: str, chunk_size: int):
+    """Yield lists of up to chunk_size consecutive frames from a video file"""
+    cap = cv2.VideoCapture(path)
+    try:
+        chunk = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            chunk.append(frame)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        cap.release()
+
+class PoseLandmark(NamedTuple):
+    """One landmark of the public result; a plain tuple, so 33 per frame are cheap to build"""
     x: float
     y: float
     z: float
     visibility: float
 
+# Rep-counting phases, stored as ints so per-frame transitions compare small ints, not strings
+PHASE_READY: Final = 0
+PHASE_UP: Final = 1      # Bicep curls: 'extended'
+PHASE_DOWN: Final = 2    # Bicep curls: 'curled'
+PHASE_NAMES: Final = ('ready', 'up', 'down')
+CURL_PHASE_NAMES: Final = ('ready', 'extended', 'curled')
+
+# What a rep-counting step did; START/DOWN/REP index the per-exercise *_REP_MESSAGES (minus one)
+REP_EVENT_NONE: Final = 0
+REP_EVENT_START: Final = 1
+REP_EVENT_DOWN: Final = 2
+REP_EVENT_REP: Final = 3
+
+def _rep_state_step_py(phase, stable_frames, rep_count, last_rep_frame, frame_count, angle,
+                       up_angle, down_angle, hysteresis, min_stable_frames, min_rep_frames):
+    """
+    One frame of the shared ready -> up -> down -> up rep-counting state machine
+    
+    Returns (phase, stable_frames, rep_count, last_rep_frame, event).
+    """
+    event = REP_EVENT_NONE
+    
+    if phase == PHASE_READY:
+        if angle > up_angle:
+            phase = PHASE_UP
+            stable_frames = 0
+            event = REP_EVENT_START
+    
+    elif phase == PHASE_UP:
+        if angle < down_angle:
+            phase = PHASE_DOWN
+            stable_frames = 0
+            event = REP_EVENT_DOWN
+    
+    elif phase == PHASE_DOWN:
+        # Require stable frames in the down position before counting up
+        if angle < down_angle + hysteresis:
+            stable_frames += 1
+        
+        if angle > up_angle and stable_frames >= min_stable_frames:
+            # Check minimum time between reps (prevent double counting)
+            if frame_count - last_rep_frame > min_rep_frames:
+                phase = PHASE_UP
+                rep_count += 1
+                last_rep_frame = frame_count
+                stable_frames = 0
+                event = REP_EVENT_REP
+    
+    return phase, stable_frames, rep_count, last_rep_frame, event
+
+if njit is not None:
+    _rep_state_step = njit(cache=True)(_rep_state_step_py)
+else:
+    _rep_state_step = _rep_state_step_py
+
+@dataclass(slots=True)
+class SessionState:
+    """Per-session exercise tracking state (fixed fields, attribute access)"""
+    exercise_name: str
+    rep_count: int = 0
+    phase: int = PHASE_READY
+    last_angles: Dict[str, float] = field(default_factory=dict)
+    movement_direction: str = 'none'
+    frame_count: int = 0
+    stable_frames: int = 0
+    last_rep_frame: int = 0
+    last_angle: float = 0
+    last_seen: float = 0  # time.monotonic() of the last analyzed frame
+    
+    @property
+    def current_phase(self) -> str:
+        """Phase name as reported to clients"""
+        names = CURL_PHASE_NAMES if self.exercise_name == 'bicep_curls' else PHASE_NAMES
+        return names[self.phase]
+    
+    def to_dict(self) -> Dict:
+        data = {}
+        for key, value in asdict(self).items():
+            if key == 'phase':
+                data['current_phase'] = self.current_phase
+            elif key != 'last_seen':
+                data[key] = value
+        return data
+
+class LRUDict(OrderedDict):
+    """
+    Dict that evicts the least recently used entry once it holds more than maxsize entries
+    
+    Reads reorder entries, so every access takes a lock to stay safe across threads.
+    """
+    
+    def __init__(self, maxsize: int = 10000):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+    
+    def __getitem__(self, key):
+        with self._lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+    
+    def get(self, key, default=None):
+        with self._lock:
+            return self[key] if key in self else default
+    
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            if len(self) > self.maxsize:
+                self.popitem(last=False)
+    
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+    
+    def pop(self, key, *default):
+        with self._lock:
+            return super().pop(key, *default)
+    
+    def oldest(self):
+        """The least recently used (key, value) pair without touching it, or None when empty"""
+        with self._lock:
+            return next(iter(self.items()), None)
+
 @dataclass
 class ExerciseResult:
     rep_count: int
@@ -32,17 +396,27 @@ class MediaPipeService:
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
         
-        # Initialize MediaPipe Pose with optimized settings
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,  # Balance between accuracy and performance
-            enable_segmentation=False,
-            min_detection_confidence=0.6,
-            min_tracking_confidence=0.6
-        )
+        # Pose.process is not thread-safe, so each thread gets its own Pose and frame buffers
+        self._thread_local = threading.local()
+        
+        # Optional accelerated landmark inference; None runs self.pose on the CPU.
+        # One shared instance (a model per thread would multiply GPU memory), serialized by a lock
+        self.pose_backend = self._create_pose_backend()
+        self._backend_lock = threading.Lock()
         
-        # Exercise state tracking with improved structure
-        self.exercise_states = {}
+        # Exercise state tracking, bounded so abandoned sessions are eventually evicted
+        self.exercise_states: LRUDict = LRUDict(maxsize=settings.MAX_TRACKED_SESSIONS)
+        self._states_lock = threading.Lock()
+        
+        # Exercise analyzers by lower-cased exercise name
+        self._analyzers = {
+            'push_ups': self._analyze_push_ups_improved,
+            'squats': self._analyze_squats_improved,
+            'bicep_curls': self._analyze_bicep_curls_improved,
+        }
+        
+        # Last inferred frame per session: (downscaled grayscale frame, landmark array or None)
+        self._pose_cache: LRUDict = LRUDict(maxsize=settings.MAX_TRACKED_SESSIONS)
         
         # Pose connections for skeleton drawing
         self.pose_connections = [
@@ -57,381 +431,465 @@ class MediaPipeService:
             # Right leg
             (24, 26), (26, 28), (28, 30), (28, 32), (30, 32)
         ]
+        self._connection_idx = np.array(self.pose_connections, dtype=np.intp)
+    
+    @property
+    def pose(self):
+        """MediaPipe Pose for the calling thread, created on its first frame"""
+        pose = getattr(self._thread_local, 'pose', None)
+        if pose is None:
+            pose = self._thread_local.pose = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=settings.POSE_MODEL_COMPLEXITY,  # 1 balances accuracy and performance, 0 is ~2-3x faster
+                enable_segmentation=False,
+                min_detection_confidence=POSE_MIN_CONFIDENCE,
+                min_tracking_confidence=POSE_MIN_CONFIDENCE
+            )
+        return pose
+    
+    def _create_pose_backend(self):
+        """Select the landmark inference backend from settings.POSE_BACKEND"""
+        backend = settings.POSE_BACKEND
+        
+        if backend == 'mediapipe_gpu':
+            # MediaPipe Tasks PoseLandmarker with the GPU delegate
+            return create_task_pose_landmarker(settings.POSE_TASK_MODEL_PATH, True, POSE_MIN_CONFIDENCE)
+        if backend == 'onnx':
+            # BlazePose landmark model on ONNX Runtime (CUDA/TensorRT/CPU providers)
+            return create_onnx_pose_landmarker(
+                settings.POSE_ONNX_MODEL_PATH,
+                settings.POSE_ONNX_PROVIDERS,
+                settings.POSE_ONNX_INTRA_OP_THREADS,
+                tensorrt_provider_options(
+                    settings.POSE_TRT_PRECISION,
+                    settings.POSE_TRT_CACHE_DIR,
+                    settings.POSE_TRT_INT8_CALIBRATION_TABLE
+                )
+            )
+        if backend != 'mediapipe':
+            logger.warning(f"Unknown POSE_BACKEND '{backend}'; using MediaPipe on the CPU")
+        return None
     
     def process_frame(self, frame: np.ndarray, exercise_name: str, session_id: str) -> Optional[ExerciseResult]:
         """
         Process a single frame for pose detection and exercise analysis
         """
         try:
-            # Convert BGR to RGB for MediaPipe
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process the frame
-            results = self.pose.process(rgb_frame)
+            # Extract landmarks once into an array (or reuse them for a near-identical frame)
+            points = self._detect_pose(frame, session_id)
             
-            if not results.pose_landmarks:
-                logger.debug(f"No pose landmarks detected for session {session_id}")
+            if points is None:
+                logger.debug("No pose landmarks detected for session %s", session_id)
                 return None
-                
-            # Extract landmarks with improved mapping
-            landmarks = self._extract_landmarks_improved(results.pose_landmarks)
-            
-            # Initialize session state if needed
-            if session_id not in self.exercise_states:
-                self.exercise_states[session_id] = {
-                    'rep_count': 0,
-                    'current_phase': 'ready',
-                    'last_angles': {},
-                    'movement_direction': 'none',
-                    'frame_count': 0,
-                    'stable_frames': 0,
-                    'last_rep_frame': 0,
-                    'last_angle': 0,
-                    'exercise_name': exercise_name.lower()
-                }
-                logger.info(f"Initialized exercise state for session {session_id} - {exercise_name}")
             
-            state = self.exercise_states[session_id]
-            state['frame_count'] += 1
-            
-            # Analyze exercise based on type with improved algorithms
-            exercise_lower = exercise_name.lower()
-            
-            if exercise_lower == 'push_ups':
-                result = self._analyze_push_ups_improved(landmarks, session_id)
-            elif exercise_lower == 'squats':
-                result = self._analyze_squats_improved(landmarks, session_id)
-            elif exercise_lower == 'bicep_curls':
-                result = self._analyze_bicep_curls_improved(landmarks, session_id)
-            else:
-                result = self._generic_analysis(landmarks, session_id)
-            
-            return result
+            return self._analyze_points(points, exercise_name, session_id)
             
         except Exception as e:
             logger.error(f"Error processing frame for session {session_id}: {e}")
             return None
     
-    def _extract_landmarks_improved(self, pose_landmarks) -> Dict[str, PoseLandmark]:
-        """Extract key landmarks with improved mapping"""
-        landmarks = {}
-        
-        # MediaPipe landmark indices
-        landmark_indices = {
-            'nose': 0,
-            'left_eye_inner': 1, 'left_eye': 2, 'left_eye_outer': 3,
-            'right_eye_inner': 4, 'right_eye': 5, 'right_eye_outer': 6,
-            'left_ear': 7, 'right_ear': 8,
-            'mouth_left': 9, 'mouth_right': 10,
-            'left_shoulder': 11, 'right_shoulder': 12,
-            'left_elbow': 13, 'right_elbow': 14,
-            'left_wrist': 15, 'right_wrist': 16,
-            'left_pinky': 17, 'right_pinky': 18,
-            'left_index': 19, 'right_index': 20,
-            'left_thumb': 21, 'right_thumb': 22,
-            'left_hip': 23, 'right_hip': 24,
-            'left_knee': 25, 'right_knee': 26,
-            'left_ankle': 27, 'right_ankle': 28,
-            'left_heel': 29, 'right_heel': 30,
-            'left_foot_index': 31, 'right_foot_index': 32
-        }
+    @property
+    def supports_batching(self) -> bool:
+        """Whether process_frames runs a batch through one inference call"""
+        return hasattr(self.pose_backend, 'infer_batch')
+    
+    def process_frames(self, frames: List[np.ndarray], exercise_name: str, session_id: str) -> List[Optional[ExerciseResult]]:
+        """
+        Process consecutive frames of one session, in order
         
-        for name, idx in landmark_indices.items():
-            if idx < len(pose_landmarks.landmark):
-                landmark = pose_landmarks.landmark[idx]
-                landmarks[name] = PoseLandmark(
-                    x=landmark.x,
-                    y=landmark.y,
-                    z=landmark.z,
-                    visibility=landmark.visibility
-                )
+        With a batching backend the frames go through a single inference call. The CPU
+        MediaPipe tracker carries state from frame to frame, so it keeps running them one by one.
+        
+        Returns:
+            One result per frame (None where no pose was detected or analysis failed)
+        """
+        if not self.supports_batching:
+            return [self.process_frame(frame, exercise_name, session_id) for frame in frames]
         
-        return landmarks
+        try:
+            rgb_frames = [cv2.cvtColor(_downscale_for_inference(frame), cv2.COLOR_BGR2RGB) for frame in frames]
+            with self._backend_lock:
+                detected = self.pose_backend.infer_batch(rgb_frames, POSE_MIN_CONFIDENCE)
+        except Exception as e:
+            logger.error(f"Error detecting poses for session {session_id}: {e}")
+            return [None] * len(frames)
+        
+        results = []
+        for points in detected:
+            try:
+                results.append(self._analyze_points(points, exercise_name, session_id) if points is not None else None)
+            except Exception as e:
+                logger.error(f"Error processing frame for session {session_id}: {e}")
+                results.append(None)
+        return results
     
-    def _calculate_angle_3d(self, point1: PoseLandmark, point2: PoseLandmark, point3: PoseLandmark) -> float:
-        """Calculate 3D angle between three points for better accuracy"""
-        # Convert to numpy arrays with 3D coordinates
-        a = np.array([point1.x, point1.y, point1.z])
-        b = np.array([point2.x, point2.y, point2.z])
-        c = np.array([point3.x, point3.y, point3.z])
+    def process_video(self, path: str, exercise_name: str, session_id: str) -> List[Optional[ExerciseResult]]:
+        """
+        Analyze a recorded video, running pose detection on every CPU core
+        
+        Frames are read in chunks and detected by a pool of worker processes, each
+        with its own Pose instance, or in one batched call per chunk when the pose
+        backend supports batching. Rep counting depends on frame order, so the
+        exercise analysis then runs sequentially over the detected landmarks.
         
-        # Calculate vectors
-        ba = a - b
-        bc = c - b
+        Returns:
+            One result per frame (None where no pose was detected)
+        """
+        detected = self._detect_video(path, session_id)
+        
+        results = []
+        for points in detected:
+            try:
+                results.append(self._analyze_points(points, exercise_name, session_id) if points is not None else None)
+            except Exception as e:
+                logger.error(f"Error analyzing frame for session {session_id}: {e}")
+                results.append(None)
+        
+        logger.info(f"Processed video {path} for session {session_id}: {len(results)} frames")
+        return results
+    
+    def _detect_video(self, path: str, session_id: str) -> List[Optional[np.ndarray]]:
+        """Detect landmarks for every frame of a video file, in frame order"""
+        chunks = _read_frame_chunks(path, VIDEO_CHUNK_SIZE)
+        
+        if hasattr(self.pose_backend, 'infer_batch'):
+            # Accelerated backends take a whole chunk per inference call instead of a process pool
+            detected = []
+            for chunk in chunks:
+                rgb_frames = [cv2.cvtColor(_downscale_for_inference(frame), cv2.COLOR_BGR2RGB) for frame in chunk]
+                with self._backend_lock:
+                    detected.extend(self.pose_backend.infer_batch(rgb_frames, POSE_MIN_CONFIDENCE))
+            return detected
+        
+        try:
+            # Spawned (not forked) so workers do not inherit the parent's running MediaPipe graph threads
+            with multiprocessing.get_context('spawn').Pool(
+                processes=os.cpu_count(),
+                initializer=_init_pose_worker,
+                initargs=(settings.POSE_MODEL_COMPLEXITY,)
+            ) as pool:
+                return [points for batch in pool.imap(_pose_batch, chunks) for points in batch]
+        except (AssertionError, OSError) as e:
+            # e.g. daemonic Celery worker processes cannot start a pool of their own
+            logger.warning(f"Falling back to in-process pose detection for session {session_id}: {e}")
+            return [
+                self._detect_pose(frame, session_id)
+                for chunk in _read_frame_chunks(path, VIDEO_CHUNK_SIZE) for frame in chunk
+            ]
+    
+    def _analyze_points(self, points: np.ndarray, exercise_name: str, session_id: str) -> ExerciseResult:
+        """Run the session's exercise analysis on one frame's landmark array"""
+        landmarks = self._extract_landmarks_improved(points)
+        
+        now = time.monotonic()
+        
+        # Initialize session state if needed
+        state = self.exercise_states.get(session_id)
+        if state is None:
+            with self._states_lock:
+                state = self.exercise_states.get(session_id)
+                if state is None:
+                    self._evict_idle_sessions(now)
+                    state = self.exercise_states[session_id] = SessionState(exercise_name=exercise_name.lower())
+                    logger.info(f"Initialized exercise state for session {session_id} - {exercise_name}")
+        
+        state.frame_count += 1
+        state.last_seen = now
+        
+        # Skip the analyzer on frames where the limbs it counts reps from are occluded or out of frame
+        if not self._critical_landmarks_visible(points, state.exercise_name):
+            return ExerciseResult(
+                rep_count=state.rep_count,
+                current_phase=state.current_phase,
+                form_feedback=["Move into frame"],
+                accuracy_score=0.0,
+                landmarks=landmarks,
+                angle_data={}
+            )
+        
+        # Analyze exercise based on type (name was lower-cased once when the session started)
+        analyzer = self._analyzers.get(state.exercise_name, self._generic_analysis)
+        # The state is passed in, so a concurrent reset_session cannot pull it out from under the analyzer
+        return analyzer(points, landmarks, state)
+    
+    def _evict_idle_sessions(self, now: float):
+        """Drop sessions idle for longer than SESSION_IDLE_TIMEOUT (least recently used are at the head)"""
+        timeout = settings.SESSION_IDLE_TIMEOUT
+        if timeout <= 0:
+            return
+        
+        while (oldest := self.exercise_states.oldest()) is not None:
+            session_id, state = oldest
+            if now - state.last_seen <= timeout:
+                break
+            
+            self.exercise_states.pop(session_id, None)
+            self._pose_cache.pop(session_id, None)
+            logger.info(f"Evicted idle session state for {session_id}")
+    
+    def _critical_landmarks_visible(self, points: np.ndarray, exercise_name: str) -> bool:
+        """Whether every landmark of one of the exercise's critical groups is visible enough to analyze"""
+        groups = CRITICAL_LANDMARKS.get(exercise_name)
+        if groups is None:
+            return True
+        
+        return any(
+            min(points[idx, VISIBILITY] for idx in group) >= MIN_LANDMARK_VISIBILITY
+            for group in groups
+        )
+    
+    def _detect_pose(self, frame: np.ndarray, session_id: str) -> Optional[np.ndarray]:
+        """Run pose inference, skipping it when the frame barely differs from the last inferred one"""
+        source = frame
+        local = self._thread_local
+        frame = _downscale_for_inference(frame, dst=getattr(local, 'small_buf', None))
+        if frame is not source:
+            local.small_buf = frame
+        threshold = settings.POSE_FRAME_SKIP_THRESHOLD
+        small_gray = None
+        
+        if threshold > 0:
+            # Compare 8x-downscaled grayscale frames; static segments reuse the previous pose
+            height, width = frame.shape[:2]
+            small = cv2.resize(frame, (max(1, width // 8), max(1, height // 8)), interpolation=cv2.INTER_AREA)
+            small_gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            
+            cached = self._pose_cache.get(session_id)
+            if cached is not None and cached[0].shape == small_gray.shape:
+                if cv2.absdiff(small_gray, cached[0]).mean() < threshold:
+                    return cached[1]
+        
+        # Convert BGR to RGB for MediaPipe without allocating: in place when the frame is
+        # our own downscaled copy, otherwise into the persistent buffer (callers keep drawing on theirs)
+        if frame is not source:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+        else:
+            rgb_buf = getattr(local, 'rgb_buf', None)
+            if rgb_buf is None or rgb_buf.shape != frame.shape:
+                rgb_buf = local.rgb_buf = np.empty_like(frame)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buf)
+        
+        # Process the frame
+        if self.pose_backend is not None:
+            with self._backend_lock:
+                points = self.pose_backend.infer(rgb_frame, min_score=POSE_MIN_CONFIDENCE)
+        else:
+            results = self.pose.process(rgb_frame)
+            points = self._landmarks_to_array(results.pose_landmarks) if results.pose_landmarks else None
+        
+        if small_gray is not None:
+            self._pose_cache[session_id] = (small_gray, points)
+        
+        return points
+    
+    def _landmarks_to_array(self, pose_landmarks) -> np.ndarray:
+        """Copy MediaPipe landmarks into an (N, 4) array of x, y, z, visibility"""
+        return _pose_landmarks_to_array(pose_landmarks)
+    
+    def _extract_landmarks_improved(self, points: np.ndarray) -> Dict[str, PoseLandmark]:
+        """Extract key landmarks with improved mapping"""
+        # Analyzers index the array by LM id; the named dict is only built here for the public result
+        rows = points.tolist()
+        return {
+            name: PoseLandmark._make(rows[idx])
+            for name, idx in LANDMARK_ITEMS if idx < len(rows)
+        }
+    
+    def _calculate_joint_angles(self, points: np.ndarray, triplets: np.ndarray) -> np.ndarray:
+        """Calculate the angle (degrees) of every triplet in one batched call"""
+        return _joint_angles(points, triplets)
+    
+    def _calculate_angle_3d(self, points: np.ndarray, idx1: int, idx2: int, idx3: int) -> float:
+        """Calculate 3D angle at landmark idx2 between landmarks idx1 and idx3 of the frame's landmark array"""
+        # Plain float math: NumPy calls on 3-element vectors cost more in dispatch than arithmetic
+        x1, y1, z1 = points[idx1, :3].tolist()
+        x2, y2, z2 = points[idx2, :3].tolist()
+        x3, y3, z3 = points[idx3, :3].tolist()
+        bax, bay, baz = x1 - x2, y1 - y2, z1 - z2
+        bcx, bcy, bcz = x3 - x2, y3 - y2, z3 - z2
         
         # Calculate angle using dot product
-        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-        cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
-        angle = np.arccos(cosine_angle)
+        dot = bax * bcx + bay * bcy + baz * bcz
+        norm = math.sqrt(bax * bax + bay * bay + baz * baz) * math.sqrt(bcx * bcx + bcy * bcy + bcz * bcz)
+        if norm == 0:
+            return float('nan')
+        cosine_angle = min(1.0, max(-1.0, dot / norm))
         
-        return np.degrees(angle)
+        return math.degrees(math.acos(cosine_angle))
     
-    def _calculate_distance(self, point1: PoseLandmark, point2: PoseLandmark) -> float:
-        """Calculate distance between two landmarks"""
-        return np.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2 + (point1.z - point2.z)**2)
+    def _calculate_distance(self, points: np.ndarray, idx1: int, idx2: int) -> float:
+        """Calculate distance between two landmarks of the frame's landmark array"""
+        dx, dy, dz = (points[idx1, :3] - points[idx2, :3]).tolist()
+        return math.hypot(dx, dy, dz)
+    
+    def _update_rep_state(self, state: SessionState, angle: float, up_angle: float, down_angle: float,
+                          hysteresis: float, min_stable_frames: int, min_rep_frames: int) -> int:
+        """Advance the session's rep-counting state machine by one frame; returns the REP_EVENT_* that fired"""
+        state.phase, state.stable_frames, state.rep_count, state.last_rep_frame, event = _rep_state_step(
+            state.phase, state.stable_frames, state.rep_count, state.last_rep_frame, state.frame_count,
+            angle, up_angle, down_angle, hysteresis, min_stable_frames, min_rep_frames
+        )
+        return event
     
-    def _analyze_push_ups_improved(self, landmarks: Dict[str, PoseLandmark], session_id: str) -> ExerciseResult:
+    def _analyze_push_ups_improved(self, points: np.ndarray, landmarks: Dict[str, PoseLandmark], state: SessionState) -> ExerciseResult:
         """Improved push-up analysis with better accuracy and form checking"""
-        state = self.exercise_states[session_id]
         feedback = []
         angle_data = {}
         
-        # Calculate key angles
-        left_elbow_angle = self._calculate_angle_3d(
-            landmarks['left_shoulder'],
-            landmarks['left_elbow'],
-            landmarks['left_wrist']
-        )
-        
-        right_elbow_angle = self._calculate_angle_3d(
-            landmarks['right_shoulder'],
-            landmarks['right_elbow'],
-            landmarks['right_wrist']
-        )
+        # Calculate key angles (elbows and body alignment) in one batched call, as plain floats for the scalar checks below
+        left_elbow_angle, right_elbow_angle, body_angle = self._calculate_joint_angles(points, PUSHUP_TRIPLETS).tolist()
         
         # Average elbow angle for rep counting
         avg_elbow_angle = (left_elbow_angle + right_elbow_angle) / 2
         angle_data['elbow_angle'] = avg_elbow_angle
         
         # Body alignment angle (shoulder to hip)
-        body_angle = self._calculate_angle_3d(
-            landmarks['left_shoulder'],
-            landmarks['left_hip'],
-            landmarks['left_ankle']
-        )
         angle_data['body_angle'] = body_angle
         
         # IMPROVED push-up phase detection with better thresholds
-        current_phase = state['current_phase']
-        rep_detected = False
-        
-        # More accurate phase thresholds
-        UP_THRESHOLD = 140    # Arms mostly extended
-        DOWN_THRESHOLD = 80   # Arms bent at bottom
-        HYSTERESIS = 10       # Prevent oscillation
+        current_phase = state.phase
         
         # State machine for rep counting
-        if current_phase == 'ready':
-            if avg_elbow_angle > UP_THRESHOLD:
-                state['current_phase'] = 'up'
-                state['stable_frames'] = 0
-                feedback.append("Starting position detected")
-        
-        elif current_phase == 'up':
-            if avg_elbow_angle < DOWN_THRESHOLD:
-                state['current_phase'] = 'down'
-                state['stable_frames'] = 0
-                feedback.append("Going down")
-        
-        elif current_phase == 'down':
-            # Require stable frames in down position before counting up
-            if avg_elbow_angle < DOWN_THRESHOLD + HYSTERESIS:
-                state['stable_frames'] += 1
-            
-            if avg_elbow_angle > UP_THRESHOLD and state['stable_frames'] >= 3:
-                # Check minimum time between reps (prevent double counting)
-                frames_since_last_rep = state['frame_count'] - state['last_rep_frame']
-                if frames_since_last_rep > 20:  # Minimum 2 seconds at 10 FPS
-                    state['current_phase'] = 'up'
-                    state['rep_count'] += 1
-                    state['last_rep_frame'] = state['frame_count']
-                    state['stable_frames'] = 0
-                    rep_detected = True
-                    feedback.append(f"Push-up {state['rep_count']} completed!")
+        event = self._update_rep_state(
+            state, avg_elbow_angle, PUSHUP_UP_ANGLE, PUSHUP_DOWN_ANGLE, PUSHUP_HYSTERESIS,
+            PUSHUP_MIN_STABLE_FRAMES, PUSHUP_MIN_REP_FRAMES
+        )
+        if event != REP_EVENT_NONE:
+            feedback.append(PUSHUP_REP_MESSAGES[event - 1].format(state.rep_count))
         
         # Form analysis with detailed feedback
         accuracy_score = 1.0
         
         # 1. Check elbow flare
-        shoulder_width = self._calculate_distance(landmarks['left_shoulder'], landmarks['right_shoulder'])
-        elbow_width = self._calculate_distance(landmarks['left_elbow'], landmarks['right_elbow'])
+        shoulder_width = self._calculate_distance(points, LM.LEFT_SHOULDER, LM.RIGHT_SHOULDER)
+        elbow_width = self._calculate_distance(points, LM.LEFT_ELBOW, LM.RIGHT_ELBOW)
         
         elbow_flare_ratio = elbow_width / shoulder_width if shoulder_width > 0 else 0
-        if elbow_flare_ratio > 1.6:
+        if elbow_flare_ratio > PUSHUP_ELBOW_FLARE_MAX:
             feedback.append("Keep elbows closer to your body")
             accuracy_score -= 0.15
-        elif elbow_flare_ratio < 1.3:
+        elif elbow_flare_ratio < PUSHUP_ELBOW_FLARE_GOOD:
             feedback.append("Good elbow position!")
         
         # 2. Check body alignment (plank position)
-        if body_angle < 150 or body_angle > 210:
+        if body_angle < PUSHUP_BODY_ANGLE_MIN or body_angle > PUSHUP_BODY_ANGLE_MAX:
             feedback.append("Keep your body in a straight line")
             accuracy_score -= 0.2
         else:
             feedback.append("Excellent body alignment!")
         
         # 3. Check depth based on current phase
-        if current_phase == 'down':
-            if avg_elbow_angle > 100:
+        if current_phase == PHASE_DOWN:
+            if avg_elbow_angle > PUSHUP_SHALLOW_ANGLE:
                 feedback.append("Go deeper - lower your chest more")
                 accuracy_score -= 0.15
-            elif avg_elbow_angle < 60:
+            elif avg_elbow_angle < PUSHUP_DEEP_ANGLE:
                 feedback.append("Perfect depth!")
                 accuracy_score += 0.05
             else:
                 feedback.append("Good depth!")
         
         # 4. Check hand position relative to shoulders
-        left_hand_shoulder_dist = abs(landmarks['left_wrist'].y - landmarks['left_shoulder'].y)
-        right_hand_shoulder_dist = abs(landmarks['right_wrist'].y - landmarks['right_shoulder'].y)
+        left_hand_shoulder_dist = abs(points[LM.LEFT_WRIST, Y] - points[LM.LEFT_SHOULDER, Y])
+        right_hand_shoulder_dist = abs(points[LM.RIGHT_WRIST, Y] - points[LM.RIGHT_SHOULDER, Y])
         
-        if left_hand_shoulder_dist > 0.15 or right_hand_shoulder_dist > 0.15:
+        if left_hand_shoulder_dist > PUSHUP_HAND_OFFSET_MAX or right_hand_shoulder_dist > PUSHUP_HAND_OFFSET_MAX:
             feedback.append("Align hands with shoulders")
             accuracy_score -= 0.1
         
         return ExerciseResult(
-            rep_count=state['rep_count'],
-            current_phase=state['current_phase'],
+            rep_count=state.rep_count,
+            current_phase=state.current_phase,
             form_feedback=feedback,
             accuracy_score=max(0.0, min(1.0, accuracy_score)),
             landmarks=landmarks,
             angle_data=angle_data
         )
     
-    def _analyze_squats_improved(self, landmarks: Dict[str, PoseLandmark], session_id: str) -> ExerciseResult:
+    def _analyze_squats_improved(self, points: np.ndarray, landmarks: Dict[str, PoseLandmark], state: SessionState) -> ExerciseResult:
         """Improved squat analysis with better form checking"""
-        state = self.exercise_states[session_id]
         feedback = []
         angle_data = {}
         
-        # Calculate key angles
-        left_knee_angle = self._calculate_angle_3d(
-            landmarks['left_hip'],
-            landmarks['left_knee'],
-            landmarks['left_ankle']
-        )
-        
-        right_knee_angle = self._calculate_angle_3d(
-            landmarks['right_hip'],
-            landmarks['right_knee'],
-            landmarks['right_ankle']
-        )
+        # Calculate key angles (knees and left hip) in one batched call; the hip angle doubles as the torso angle
+        left_knee_angle, right_knee_angle, hip_angle = self._calculate_joint_angles(points, SQUAT_TRIPLETS).tolist()
         
         avg_knee_angle = (left_knee_angle + right_knee_angle) / 2
         angle_data['knee_angle'] = avg_knee_angle
         
         # Hip angle for depth analysis
-        left_hip_angle = self._calculate_angle_3d(
-            landmarks['left_shoulder'],
-            landmarks['left_hip'],
-            landmarks['left_knee']
-        )
-        angle_data['hip_angle'] = left_hip_angle
+        angle_data['hip_angle'] = hip_angle
         
         # IMPROVED squat phase detection with better thresholds
-        current_phase = state['current_phase']
-        rep_detected = False
-        
-        # More accurate phase thresholds for squats
-        STANDING_THRESHOLD = 150  # Knees mostly straight
-        SQUAT_THRESHOLD = 90      # Deep squat position
-        HYSTERESIS = 15           # Prevent oscillation
+        current_phase = state.phase
         
         # State machine for rep counting
-        if current_phase == 'ready':
-            if avg_knee_angle > STANDING_THRESHOLD:
-                state['current_phase'] = 'up'
-                state['stable_frames'] = 0
-                feedback.append("Standing position detected")
-        
-        elif current_phase == 'up':
-            if avg_knee_angle < SQUAT_THRESHOLD:
-                state['current_phase'] = 'down'
-                state['stable_frames'] = 0
-                feedback.append("Squatting down")
-        
-        elif current_phase == 'down':
-            # Require stable frames in squat position
-            if avg_knee_angle < SQUAT_THRESHOLD + HYSTERESIS:
-                state['stable_frames'] += 1
-            
-            if avg_knee_angle > STANDING_THRESHOLD and state['stable_frames'] >= 5:
-                # Check minimum time between reps
-                frames_since_last_rep = state['frame_count'] - state['last_rep_frame']
-                if frames_since_last_rep > 25:  # Minimum 2.5 seconds at 10 FPS
-                    state['current_phase'] = 'up'
-                    state['rep_count'] += 1
-                    state['last_rep_frame'] = state['frame_count']
-                    state['stable_frames'] = 0
-                    rep_detected = True
-                    feedback.append(f"Squat {state['rep_count']} completed!")
+        event = self._update_rep_state(
+            state, avg_knee_angle, SQUAT_UP_ANGLE, SQUAT_DOWN_ANGLE, SQUAT_HYSTERESIS,
+            SQUAT_MIN_STABLE_FRAMES, SQUAT_MIN_REP_FRAMES
+        )
+        if event != REP_EVENT_NONE:
+            feedback.append(SQUAT_REP_MESSAGES[event - 1].format(state.rep_count))
         
         # Form analysis
         accuracy_score = 1.0
         
         # 1. Check knee alignment (knees over toes)
-        left_knee_ankle_dist = abs(landmarks['left_knee'].x - landmarks['left_ankle'].x)
-        right_knee_ankle_dist = abs(landmarks['right_knee'].x - landmarks['right_ankle'].x)
+        left_knee_ankle_dist = abs(points[LM.LEFT_KNEE, X] - points[LM.LEFT_ANKLE, X])
+        right_knee_ankle_dist = abs(points[LM.RIGHT_KNEE, X] - points[LM.RIGHT_ANKLE, X])
         
-        if left_knee_ankle_dist > 0.08 or right_knee_ankle_dist > 0.08:
+        if left_knee_ankle_dist > SQUAT_KNEE_OFFSET_MAX or right_knee_ankle_dist > SQUAT_KNEE_OFFSET_MAX:
             feedback.append("Keep knees aligned over your toes")
             accuracy_score -= 0.2
         else:
             feedback.append("Great knee alignment!")
         
         # 2. Check squat depth
-        if current_phase == 'down':
-            if avg_knee_angle > 110:
+        if current_phase == PHASE_DOWN:
+            if avg_knee_angle > SQUAT_SHALLOW_ANGLE:
                 feedback.append("Go deeper - squat until thighs are parallel")
                 accuracy_score -= 0.15
-            elif avg_knee_angle < 70:
+            elif avg_knee_angle < SQUAT_DEEP_ANGLE:
                 feedback.append("Excellent depth!")
                 accuracy_score += 0.05
             else:
                 feedback.append("Good squat depth!")
         
-        # 3. Check back posture using torso angle
-        torso_angle = self._calculate_angle_3d(
-            landmarks['left_shoulder'],
-            landmarks['left_hip'],
-            landmarks['left_knee']
-        )
-        
-        if torso_angle < 60 or torso_angle > 120:
+        # 3. Check back posture using the (shoulder, hip, knee) torso angle
+        if hip_angle < SQUAT_TORSO_ANGLE_MIN or hip_angle > SQUAT_TORSO_ANGLE_MAX:
             feedback.append("Keep your chest up and back straight")
             accuracy_score -= 0.15
         else:
             feedback.append("Good posture!")
         
         # 4. Check foot stability
-        left_ankle_y = landmarks['left_ankle'].y
-        right_ankle_y = landmarks['right_ankle'].y
+        left_ankle_y = points[LM.LEFT_ANKLE, Y]
+        right_ankle_y = points[LM.RIGHT_ANKLE, Y]
         
-        if abs(left_ankle_y - right_ankle_y) > 0.03:
+        if abs(left_ankle_y - right_ankle_y) > SQUAT_FEET_OFFSET_MAX:
             feedback.append("Keep both feet planted evenly")
             accuracy_score -= 0.1
         
         return ExerciseResult(
-            rep_count=state['rep_count'],
-            current_phase=state['current_phase'],
+            rep_count=state.rep_count,
+            current_phase=state.current_phase,
             form_feedback=feedback,
             accuracy_score=max(0.0, min(1.0, accuracy_score)),
             landmarks=landmarks,
             angle_data=angle_data
         )
     
-    def _analyze_bicep_curls_improved(self, landmarks: Dict[str, PoseLandmark], session_id: str) -> ExerciseResult:
+    def _analyze_bicep_curls_improved(self, points: np.ndarray, landmarks: Dict[str, PoseLandmark], state: SessionState) -> ExerciseResult:
         """Improved bicep curl analysis with better rep counting"""
-        state = self.exercise_states[session_id]
         feedback = []
         angle_data = {}
         
         # Calculate both arms for better accuracy
-        left_elbow_angle = self._calculate_angle_3d(
-            landmarks['left_shoulder'],
-            landmarks['left_elbow'],
-            landmarks['left_wrist']
-        )
-        
-        right_elbow_angle = self._calculate_angle_3d(
-            landmarks['right_shoulder'],
-            landmarks['right_elbow'],
-            landmarks['right_wrist']
-        )
+        left_elbow_angle, right_elbow_angle = self._calculate_joint_angles(points, CURL_TRIPLETS).tolist()
         
         # Use the arm with better visibility or average both
-        left_visibility = landmarks['left_elbow'].visibility
-        right_visibility = landmarks['right_elbow'].visibility
+        left_visibility = points[LM.LEFT_ELBOW, VISIBILITY]
+        right_visibility = points[LM.RIGHT_ELBOW, VISIBILITY]
         
         if left_visibility > right_visibility:
             primary_elbow_angle = left_elbow_angle
@@ -444,100 +902,71 @@ class MediaPipeService:
         angle_data['primary_arm'] = primary_arm
         
         # IMPROVED bicep curl phase detection
-        current_phase = state['current_phase']
-        rep_detected = False
-        
-        # More accurate thresholds for bicep curls
-        EXTENDED_THRESHOLD = 150   # Arm mostly straight
-        CURLED_THRESHOLD = 45      # Arm fully curled
-        HYSTERESIS = 10            # Prevent oscillation
+        current_phase = state.phase
         
         # State machine for rep counting
-        if current_phase == 'ready':
-            if primary_elbow_angle > EXTENDED_THRESHOLD:
-                state['current_phase'] = 'extended'
-                state['stable_frames'] = 0
-                feedback.append("Starting position detected")
-        
-        elif current_phase == 'extended':
-            if primary_elbow_angle < CURLED_THRESHOLD:
-                state['current_phase'] = 'curled'
-                state['stable_frames'] = 0
-                feedback.append("Curling up")
-        
-        elif current_phase == 'curled':
-            # Require stable frames in curled position
-            if primary_elbow_angle < CURLED_THRESHOLD + HYSTERESIS:
-                state['stable_frames'] += 1
-            
-            if primary_elbow_angle > EXTENDED_THRESHOLD and state['stable_frames'] >= 3:
-                # Check minimum time between reps
-                frames_since_last_rep = state['frame_count'] - state['last_rep_frame']
-                if frames_since_last_rep > 15:  # Minimum 1.5 seconds at 10 FPS
-                    state['current_phase'] = 'extended'
-                    state['rep_count'] += 1
-                    state['last_rep_frame'] = state['frame_count']
-                    state['stable_frames'] = 0
-                    rep_detected = True
-                    feedback.append(f"Bicep curl {state['rep_count']} completed!")
+        event = self._update_rep_state(
+            state, primary_elbow_angle, CURL_EXTENDED_ANGLE, CURL_CURLED_ANGLE, CURL_HYSTERESIS,
+            CURL_MIN_STABLE_FRAMES, CURL_MIN_REP_FRAMES
+        )
+        if event != REP_EVENT_NONE:
+            feedback.append(CURL_REP_MESSAGES[event - 1].format(state.rep_count))
         
         # Form analysis
         accuracy_score = 1.0
         
         # Check elbow stability for primary arm
         if primary_arm == 'left':
-            elbow_shoulder_dist = abs(landmarks['left_elbow'].x - landmarks['left_shoulder'].x)
-            elbow_y_movement = abs(landmarks['left_elbow'].y - landmarks['left_shoulder'].y)
+            elbow_shoulder_dist = abs(points[LM.LEFT_ELBOW, X] - points[LM.LEFT_SHOULDER, X])
+            elbow_y_movement = abs(points[LM.LEFT_ELBOW, Y] - points[LM.LEFT_SHOULDER, Y])
         else:
-            elbow_shoulder_dist = abs(landmarks['right_elbow'].x - landmarks['right_shoulder'].x)
-            elbow_y_movement = abs(landmarks['right_elbow'].y - landmarks['right_shoulder'].y)
+            elbow_shoulder_dist = abs(points[LM.RIGHT_ELBOW, X] - points[LM.RIGHT_SHOULDER, X])
+            elbow_y_movement = abs(points[LM.RIGHT_ELBOW, Y] - points[LM.RIGHT_SHOULDER, Y])
         
         # 1. Check elbow stability (should stay close to body)
-        if elbow_shoulder_dist > 0.12:
+        if elbow_shoulder_dist > CURL_ELBOW_DRIFT_MAX:
             feedback.append("Keep your elbow stable at your side")
             accuracy_score -= 0.2
         else:
             feedback.append("Good elbow stability!")
         
         # 2. Check for elbow dropping (elbow should stay at shoulder level)
-        if elbow_y_movement > 0.1:
+        if elbow_y_movement > CURL_ELBOW_DROP_MAX:
             feedback.append("Keep your elbow up at shoulder level")
             accuracy_score -= 0.15
         
         # 3. Check range of motion
-        if current_phase == 'curled':
-            if primary_elbow_angle > 60:
+        if current_phase == PHASE_DOWN:
+            if primary_elbow_angle > CURL_SHALLOW_ANGLE:
                 feedback.append("Curl higher for full range of motion")
                 accuracy_score -= 0.1
-            elif primary_elbow_angle < 30:
+            elif primary_elbow_angle < CURL_FULL_ANGLE:
                 feedback.append("Perfect curl!")
                 accuracy_score += 0.05
         
         # 4. Check for controlled movement (not too fast)
-        if 'last_angle' in state:
-            angle_change = abs(primary_elbow_angle - state['last_angle'])
-            if angle_change > 30:  # Too fast movement
-                feedback.append("Control the movement - slower is better")
-                accuracy_score -= 0.1
+        angle_change = abs(primary_elbow_angle - state.last_angle)
+        if angle_change > CURL_MAX_ANGLE_CHANGE:  # Too fast movement
+            feedback.append("Control the movement - slower is better")
+            accuracy_score -= 0.1
         
-        state['last_angle'] = primary_elbow_angle
+        state.last_angle = primary_elbow_angle
         
         return ExerciseResult(
-            rep_count=state['rep_count'],
-            current_phase=state['current_phase'],
+            rep_count=state.rep_count,
+            current_phase=state.current_phase,
             form_feedback=feedback,
             accuracy_score=max(0.0, min(1.0, accuracy_score)),
             landmarks=landmarks,
             angle_data=angle_data
         )
     
-    def _generic_analysis(self, landmarks: Dict[str, PoseLandmark], session_id: str) -> ExerciseResult:
+    def _generic_analysis(self, points: np.ndarray, landmarks: Dict[str, PoseLandmark], state: SessionState) -> ExerciseResult:
         """Generic analysis for unknown exercises"""
-        state = self.exercise_states[session_id]
         
         return ExerciseResult(
-            rep_count=state['rep_count'],
-            current_phase=state['current_phase'],
+            rep_count=state.rep_count,
+            current_phase=state.current_phase,
             form_feedback=["Exercise analysis not yet implemented"],
             accuracy_score=0.5,
             landmarks=landmarks,
@@ -551,42 +980,24 @@ class MediaPipeService:
         
         height, width = frame.shape[:2]
         
-        # Draw skeleton connections
-        for connection in self.pose_connections:
-            start_idx, end_idx = connection
-            
-            # Map MediaPipe indices to our landmark names
-            landmark_names = list(landmarks.keys())
-            if start_idx < len(landmark_names) and end_idx < len(landmark_names):
-                start_name = landmark_names[start_idx] if start_idx < len(landmark_names) else None
-                end_name = landmark_names[end_idx] if end_idx < len(landmark_names) else None
-                
-                if start_name in landmarks and end_name in landmarks:
-                    start_landmark = landmarks[start_name]
-                    end_landmark = landmarks[end_name]
-                    
-                    if start_landmark.visibility > 0.5 and end_landmark.visibility > 0.5:
-                        start_point = (int(start_landmark.x * width), int(start_landmark.y * height))
-                        end_point = (int(end_landmark.x * width), int(end_landmark.y * height))
-                        
-                        cv2.line(frame, start_point, end_point, (0, 255, 0), 2)
-        
-        # Draw landmark points
+        # Pixel position and visibility by MediaPipe landmark id (missing landmarks stay invisible)
+        values = np.zeros((len(LANDMARK_NAMES), 3), dtype=np.float64)
         for name, landmark in landmarks.items():
-            if landmark.visibility > 0.5:
-                x = int(landmark.x * width)
-                y = int(landmark.y * height)
-                
-                # Different colors for different body parts
-                if 'shoulder' in name or 'elbow' in name or 'wrist' in name:
-                    color = (255, 0, 0)  # Blue for arms
-                elif 'hip' in name or 'knee' in name or 'ankle' in name:
-                    color = (0, 0, 255)  # Red for legs
-                else:
-                    color = (255, 255, 0)  # Cyan for other points
-                
-                cv2.circle(frame, (x, y), 5, color, -1)
-                cv2.circle(frame, (x, y), 7, (255, 255, 255), 2)  # White border
+            idx = LANDMARK_INDICES.get(name)
+            if idx is not None:
+                values[idx] = (landmark.x, landmark.y, landmark.visibility)
+        pixels = (values[:, :2] * (width, height)).astype(np.int32)
+        visible = values[:, 2] > 0.5
+        
+        # Draw skeleton connections whose two ends are visible, in one call
+        connections = self._connection_idx[visible[self._connection_idx].all(axis=1)]
+        if len(connections):
+            cv2.polylines(frame, list(pixels[connections]), False, (0, 255, 0), 2)
+        
+        # Draw landmark points (OpenCV has no batched filled circle, so one pair of calls per point)
+        for name, (x, y) in zip(itertools.compress(LANDMARK_NAMES, visible), pixels[visible].tolist()):
+            cv2.circle(frame, (x, y), 5, LANDMARK_COLORS.get(name, OTHER_LANDMARK_COLOR), -1)
+            cv2.circle(frame, (x, y), 7, (255, 255, 255), 2)  # White border
         
         return frame
     
@@ -636,16 +1047,17 @@ class MediaPipeService:
     
     def reset_session(self, session_id: str):
         """Reset exercise state for a session"""
-        if session_id in self.exercise_states:
-            del self.exercise_states[session_id]
+        self._pose_cache.pop(session_id, None)
+        if self.exercise_states.pop(session_id, None) is not None:
             logger.info(f"Reset session state for {session_id}")
     
     def get_session_stats(self, session_id: str) -> Dict:
         """Get current session statistics"""
-        if session_id not in self.exercise_states:
+        state = self.exercise_states.get(session_id)
+        if state is None:
             return {'rep_count': 0, 'current_phase': 'ready'}
         
-        return self.exercise_states[session_id].copy()
+        return state.to_dict()
 
 # Global instance
 mediapipe_service = MediaPipeService()
\ No newline at end of file
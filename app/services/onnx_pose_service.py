@@ -0,0 +1,160 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+import logging
+import os
+
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime is optional; MediaPipe's CPU TFLite runtime is used instead
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+NUM_POSE_LANDMARKS = 33
+VALUES_PER_LANDMARK = 5  # x, y, z, visibility, presence
+DEFAULT_INPUT_SIZE = 256
+
+def _sigmoid(values: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-values))
+
+class OnnxPoseLandmarker:
+    """
+    BlazePose landmark model (pose_landmark_full exported to ONNX) on ONNX Runtime.
+    FP32 models suit the CUDA provider (or TensorRT at FP16/INT8); INT8 models from
+    quantize_pose_model.py suit the CPU one.
+
+    There is no separate person detector: the whole letterboxed frame is used as the
+    region of interest, which suits the single-person, full-body framing of workout videos.
+    """
+
+    def __init__(self, model_path: str, providers: List[str], intra_op_threads: int = 0,
+                 provider_options: Optional[Dict[str, dict]] = None):
+        available = ort.get_available_providers()
+        provider_options = provider_options or {}
+        selected = [
+            (provider, provider_options[provider]) if provider in provider_options else provider
+            for provider in providers if provider in available
+        ] or ['CPUExecutionProvider']
+
+        # Leave half the cores for form analysis and encoding when running on the CPU
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or max(1, (os.cpu_count() or 2) // 2)
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=selected)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Exports keep either the TFLite NHWC layout or NCHW; dynamic dims fall back to 256
+        shape = model_input.shape
+        self.channels_first = shape[1] == 3
+        size = shape[2] if self.channels_first else shape[1]
+        self.input_size = size if isinstance(size, int) else DEFAULT_INPUT_SIZE
+
+        # Exports with a symbolic batch dimension accept several frames per run
+        self.dynamic_batch = not isinstance(shape[0], int)
+
+        logger.info(f"Loaded ONNX pose model {model_path} with providers {self.session.get_providers()}")
+
+    def infer(self, rgb_frame: np.ndarray, min_score: float) -> Optional[np.ndarray]:
+        """Return an (N, 4) array of normalized x, y, z, visibility, or None when no pose is present"""
+        return self.infer_batch([rgb_frame], min_score)[0]
+
+    def infer_batch(self, rgb_frames: List[np.ndarray], min_score: float) -> List[Optional[np.ndarray]]:
+        """Run several frames through one session.run call when the model has a dynamic batch dimension"""
+        if not self.dynamic_batch:
+            results = []
+            for frame in rgb_frames:
+                blob, geometry = self._letterbox(frame)
+                results.append(self._decode(self._run(blob[np.newaxis]), 0, geometry, min_score))
+            return results
+
+        blobs, geometries = zip(*(self._letterbox(frame) for frame in rgb_frames))
+        outputs = self._run(np.stack(blobs))
+        return [self._decode(outputs, i, geometry, min_score) for i, geometry in enumerate(geometries)]
+
+    def _letterbox(self, rgb_frame: np.ndarray):
+        """Letterbox the frame into the square model input, scaled to [0, 1]; returns (blob, geometry)"""
+        height, width = rgb_frame.shape[:2]
+        size = self.input_size
+
+        scale = size / max(height, width)
+        resized_w, resized_h = max(1, round(width * scale)), max(1, round(height * scale))
+        pad_x, pad_y = (size - resized_w) // 2, (size - resized_h) // 2
+
+        blob = np.zeros((size, size, 3), dtype=np.float32)
+        blob[pad_y:pad_y + resized_h, pad_x:pad_x + resized_w] = cv2.resize(
+            rgb_frame, (resized_w, resized_h), interpolation=cv2.INTER_AREA
+        )
+        blob *= 1.0 / 255.0
+        if self.channels_first:
+            blob = blob.transpose(2, 0, 1)
+
+        return blob, (pad_x, pad_y, resized_w, resized_h)
+
+    def _run(self, batch: np.ndarray) -> list:
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch)})
+
+    def _decode(self, outputs: list, index: int, geometry: tuple, min_score: float) -> Optional[np.ndarray]:
+        """Turn one batch entry of the model outputs into a normalized landmark array"""
+        pad_x, pad_y, resized_w, resized_h = geometry
+
+        # Second output is the pose presence score
+        if len(outputs) > 1 and float(np.ravel(outputs[1][index])[0]) < min_score:
+            return None
+
+        raw = outputs[0][index].reshape(-1, VALUES_PER_LANDMARK)[:NUM_POSE_LANDMARKS].astype(np.float64)
+
+        # Map model pixel coordinates back to coordinates normalized to the original frame
+        points = np.empty((NUM_POSE_LANDMARKS, 4), dtype=np.float64)
+        points[:, 0] = (raw[:, 0] - pad_x) / resized_w
+        points[:, 1] = (raw[:, 1] - pad_y) / resized_h
+        points[:, 2] = raw[:, 2] / resized_w
+        points[:, 3] = _sigmoid(raw[:, 3])
+
+        return points
+
+def tensorrt_provider_options(precision: str, cache_dir: str, calibration_table: Optional[str] = None) -> dict:
+    """
+    TensorrtExecutionProvider options for the given precision (fp32, fp16 or int8)
+
+    Built engines are cached on disk (ONNX Runtime keys them by model and GPU), so only
+    the first start on a machine pays the engine build time.
+    """
+    options = {
+        'trt_engine_cache_enable': True,
+        'trt_engine_cache_path': cache_dir,
+        'trt_fp16_enable': precision in ('fp16', 'int8'),
+    }
+
+    if precision == 'int8':
+        if calibration_table:
+            options['trt_int8_enable'] = True
+            options['trt_int8_calibration_table_name'] = calibration_table
+        else:
+            logger.warning("INT8 TensorRT needs a calibration table; building an FP16 engine instead")
+
+    return options
+
+def create_onnx_pose_landmarker(model_path: Optional[str], providers: str, intra_op_threads: int = 0,
+                                tensorrt_options: Optional[dict] = None) -> Optional[OnnxPoseLandmarker]:
+    """Build the ONNX landmarker if a model is configured and onnxruntime is installed"""
+    if not model_path:
+        logger.warning("POSE_BACKEND=onnx needs POSE_ONNX_MODEL_PATH; using MediaPipe")
+        return None
+
+    if ort is None:
+        logger.warning("POSE_BACKEND=onnx but onnxruntime is not installed; using MediaPipe")
+        return None
+
+    try:
+        return OnnxPoseLandmarker(
+            model_path,
+            [p.strip() for p in providers.split(',') if p.strip()],
+            intra_op_threads,
+            {'TensorrtExecutionProvider': tensorrt_options} if tensorrt_options else None
+        )
+    except Exception as e:
+        logger.error(f"Failed to load ONNX pose model {model_path}: {e}; using MediaPipe")
+        return None
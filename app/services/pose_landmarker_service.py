@@ -0,0 +1,63 @@
+import itertools
+import numpy as np
+from typing import Optional
+import logging
+import time
+
+import mediapipe as mp
+from mediapipe.tasks.python import BaseOptions
+from mediapipe.tasks.python import vision
+
+logger = logging.getLogger(__name__)
+
+class TaskPoseLandmarker:
+    """
+    MediaPipe Tasks PoseLandmarker (.task model bundle) with a GPU or CPU delegate.
+
+    Runs in VIDEO mode so the landmarker tracks between frames like the solutions Pose does.
+    """
+
+    def __init__(self, model_path: str, use_gpu: bool, min_confidence: float):
+        delegate = BaseOptions.Delegate.GPU if use_gpu else BaseOptions.Delegate.CPU
+        options = vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path, delegate=delegate),
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=1,
+            min_pose_detection_confidence=min_confidence,
+            min_pose_presence_confidence=min_confidence,
+            min_tracking_confidence=min_confidence
+        )
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+
+        # VIDEO mode requires strictly increasing timestamps
+        self._last_timestamp_ms = 0
+
+        logger.info(f"Loaded pose landmarker {model_path} with {delegate.name} delegate")
+
+    def infer(self, rgb_frame: np.ndarray, min_score: float) -> Optional[np.ndarray]:
+        """Return an (N, 4) array of normalized x, y, z, visibility, or None when no pose is present"""
+        timestamp_ms = max(self._last_timestamp_ms + 1, int(time.monotonic() * 1000))
+        self._last_timestamp_ms = timestamp_ms
+
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        result = self.landmarker.detect_for_video(image, timestamp_ms)
+
+        # Presence is already filtered by min_pose_presence_confidence
+        if not result.pose_landmarks:
+            return None
+
+        pose = result.pose_landmarks[0]
+        values = itertools.chain.from_iterable((lm.x, lm.y, lm.z, lm.visibility) for lm in pose)
+        return np.fromiter(values, dtype=np.float64, count=len(pose) * 4).reshape(len(pose), 4)
+
+def create_task_pose_landmarker(model_path: Optional[str], use_gpu: bool, min_confidence: float) -> Optional[TaskPoseLandmarker]:
+    """Build the Tasks landmarker if a model bundle is configured"""
+    if not model_path:
+        logger.warning("POSE_BACKEND=mediapipe_gpu needs POSE_TASK_MODEL_PATH; using MediaPipe on the CPU")
+        return None
+
+    try:
+        return TaskPoseLandmarker(model_path, use_gpu, min_confidence)
+    except Exception as e:
+        logger.error(f"Failed to load pose landmarker {model_path}: {e}; using MediaPipe on the CPU")
+        return None
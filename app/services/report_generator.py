@@ -3,19 +3,129 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import getFont
 from reportlab.graphics.shapes import Drawing
 from reportlab.graphics.charts.linecharts import HorizontalLineChart
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from io import BytesIO
+import asyncio
+import functools
+import bisect
+import hashlib
+import itertools
+import json
+import threading
 import tempfile
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List
+from xml.sax.saxutils import escape
+from typing import Dict, Any, List, Optional, BinaryIO, NamedTuple, Sequence
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import _rl_accel  # noqa: F401  reportlab dispatches its PDF string helpers to this C extension when present
+except ImportError:
+    logger.warning("reportlab C accelerator (rl_accel) not installed; PDF reports use the slower pure-Python path")
+
+# Load the report fonts' metrics now rather than during the first report
+for _font_name in ('Helvetica', 'Helvetica-Bold'):
+    getFont(_font_name)
+
+# Report colors, parsed once
+TITLE_COLOR = colors.HexColor('#2c3e50')
+HEADING_COLOR = colors.HexColor('#34495e')
+SESSION_LABEL_BG = colors.HexColor('#ecf0f1')
+SESSION_GRID_COLOR = colors.HexColor('#bdc3c7')
+SUMMARY_LABEL_BG = colors.HexColor('#3498db')
+SUMMARY_GRID_COLOR = colors.HexColor('#2980b9')
+
+# Accuracy % at which each better rating starts, and the (label, color) of each tier, worst first
+RATING_CUTS = (70, 80, 90)
+RATING_TIERS = (
+    ("Needs Improvement", colors.red),
+    ("Fair", colors.orange),
+    ("Good", colors.blue),
+    ("Excellent", colors.green),
+)
+
+# (exercise name fragment, recommendation), first match wins
+EXERCISE_RECOMMENDATIONS = (
+    ('push_up', "Focus on keeping your body in a straight line and controlling the descent."),
+    ('squat', "Ensure your knees track over your toes and maintain an upright torso."),
+    ('bicep', "Keep your elbows stable at your sides and control the weight throughout the full range of motion."),
+)
+
+@functools.lru_cache(maxsize=64)
+def _exercise_recommendation(exercise_name: str) -> Optional[str]:
+    """Exercise-specific recommendation, resolved once per distinct exercise name"""
+    exercise_name = exercise_name.lower()
+    return next((rec for fragment, rec in EXERCISE_RECOMMENDATIONS if fragment in exercise_name), None)
+
+def _summary_table_style(rating_color) -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), SUMMARY_LABEL_BG),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
+        ('TEXTCOLOR', (1, 0), (1, -2), colors.black),
+        ('TEXTCOLOR', (1, -1), (1, -1), rating_color),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -2), 'Helvetica'),
+        ('FONTNAME', (1, -1), (1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('GRID', (0, 0), (-1, -1), 1, SUMMARY_GRID_COLOR)
+    ])
+
+class ReportContext(NamedTuple):
+    """Analysis result fields used by the report sections, read once per report"""
+    exercise_name: str
+    session_date: str
+    duration: float
+    processed_frames: int
+    total_reps: int
+    correct_reps: int
+    accuracy_pct: float
+    calories_burned: float
+    form_feedback: Sequence[str]
+    mistakes: Sequence[Dict[str, Any]]
+    timeline: Sequence[Dict[str, Any]]
+    
+    @classmethod
+    def from_results(cls, results: Dict[str, Any]) -> 'ReportContext':
+        """Validate and coerce the results once; missing or null fields fall back to their defaults"""
+        return cls(
+            exercise_name=str(results.get('exercise_name') or 'Unknown'),
+            session_date=datetime.now().strftime('%B %d, %Y'),
+            duration=float(results.get('duration') or 0),
+            processed_frames=int(results.get('processed_frames') or 0),
+            total_reps=int(results.get('total_reps') or 0),
+            correct_reps=int(results.get('correct_reps') or 0),
+            accuracy_pct=float(results.get('accuracy_score') or 0) * 100,
+            calories_burned=float(results.get('calories_burned') or 0),
+            form_feedback=tuple(results.get('form_feedback') or ()),
+            mistakes=tuple(results.get('mistakes') or ()),
+            timeline=tuple(results.get('analysis_timeline') or ())
+        )
+
 class WorkoutReportGenerator:
+    __slots__ = ('styles', 'title_style', 'heading_style', 'body_style', 'footer_style')
+    
+    # Styles shared by every report, built once at import
+    _SESSION_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), SESSION_LABEL_BG),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, SESSION_GRID_COLOR)
+    ])
+    # (rating label, performance summary table style) per tier, indexed by bisecting RATING_CUTS
+    _RATING_TABLE = tuple((label, _summary_table_style(color)) for label, color in RATING_TIERS)
+    
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self.title_style = ParagraphStyle(
@@ -23,7 +133,7 @@ class WorkoutReportGenerator:
             parent=self.styles['Heading1'],
             fontSize=24,
             spaceAfter=30,
-            textColor=colors.HexColor('#2c3e50'),
+            textColor=TITLE_COLOR,
             alignment=1  # Center alignment
         )
         self.heading_style = ParagraphStyle(
@@ -31,7 +141,7 @@ class WorkoutReportGenerator:
             parent=self.styles['Heading2'],
             fontSize=16,
             spaceAfter=12,
-            textColor=colors.HexColor('#34495e')
+            textColor=HEADING_COLOR
         )
         self.body_style = ParagraphStyle(
             'CustomBody',
@@ -39,131 +149,115 @@ class WorkoutReportGenerator:
             fontSize=11,
             spaceAfter=6
         )
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=self.styles['Normal'],
+            fontSize=8,
+            textColor=colors.grey,
+            alignment=1
+        )
+    
+    def _bullet_list(self, items, heading: Optional[str] = None) -> Paragraph:
+        """One paragraph of escaped bullet lines (under an optional bold heading) instead of a paragraph per bullet"""
+        lines = [f"<b>{heading}</b>"] if heading else []
+        lines.extend(f"• {escape(str(item))}" for item in items)
+        return Paragraph("<br/>".join(lines), self.body_style)
     
-    def generate_report(self, analysis_results: Dict[str, Any]) -> BytesIO:
+    def generate_report(self, analysis_results: Dict[str, Any], out: Optional[BinaryIO] = None) -> BinaryIO:
         """
         Generate comprehensive PDF workout analysis report
         
         Args:
             analysis_results: Dictionary containing analysis results
+            out: Writable binary stream (e.g. an open file) to write the PDF to;
+                a new BytesIO is used when omitted
             
         Returns:
-            BytesIO object containing the PDF report
+            The stream the PDF was written to (a BytesIO rewound to the start when out is omitted)
         """
+        # Write straight to the caller's stream, or buffer in memory
+        buffer = BytesIO() if out is None else out
+        
+        # Create document
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+        
+        # Read the fields every section needs once
+        ctx = ReportContext.from_results(analysis_results)
+        
+        # Build story (content)
+        story = []
+        
+        # Title
+        story.append(Paragraph("Workout Analysis Report", self.title_style))
+        story.append(Spacer(1, 20))
+        
+        # Sections, skipping those without data, separated by spacers
+        first_section = True
+        for include, build in self._SECTIONS:
+            if not include(ctx):
+                continue
+            section = build(self, ctx)
+            if section:
+                if not first_section:
+                    story.append(Spacer(1, 20))
+                story.extend(section)
+                first_section = False
+        
+        # Build PDF (content errors above propagate to the caller with their own traceback)
         try:
-            # Create PDF buffer
-            buffer = BytesIO()
-            
-            # Create document
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=A4,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=18
-            )
-            
-            # Build story (content)
-            story = []
-            
-            # Title
-            story.append(Paragraph("Workout Analysis Report", self.title_style))
-            story.append(Spacer(1, 20))
-            
-            # Session Information
-            story.extend(self._create_session_info(analysis_results))
-            story.append(Spacer(1, 20))
-            
-            # Performance Summary
-            story.extend(self._create_performance_summary(analysis_results))
-            story.append(Spacer(1, 20))
-            
-            # Detailed Analysis
-            story.extend(self._create_detailed_analysis(analysis_results))
-            story.append(Spacer(1, 20))
-            
-            # Form Feedback
-            story.extend(self._create_form_feedback(analysis_results))
-            story.append(Spacer(1, 20))
-            
-            # Mistakes and Improvements
-            story.extend(self._create_mistakes_section(analysis_results))
-            story.append(Spacer(1, 20))
-            
-            # Timeline Summary
-            story.extend(self._create_timeline_summary(analysis_results))
-            story.append(Spacer(1, 20))
-            
-            # Recommendations
-            story.extend(self._create_recommendations(analysis_results))
-            
-            # Build PDF
             doc.build(story)
-            
-            # Reset buffer position
-            buffer.seek(0)
-            
-            logger.info("PDF report generated successfully")
-            return buffer
-            
-        except Exception as e:
-            logger.error(f"Error generating PDF report: {e}")
+        except Exception:
+            logger.exception("PDF report layout failed")
             raise
+        
+        # Reset buffer position
+        if out is None:
+            buffer.seek(0)
+        
+        logger.info("PDF report generated successfully")
+        return buffer
     
-    def _create_session_info(self, results: Dict[str, Any]) -> List:
+    def _create_session_info(self, ctx: ReportContext) -> List:
         """Create session information section"""
         content = []
         
         content.append(Paragraph("Session Information", self.heading_style))
         
         session_data = [
-            ['Exercise Type:', results.get('exercise_name', 'Unknown').replace('_', ' ').title()],
-            ['Session Date:', datetime.now().strftime('%B %d, %Y')],
-            ['Duration:', f"{results.get('duration', 0):.1f} seconds"],
-            ['Total Frames Analyzed:', str(results.get('processed_frames', 0))],
-            ['Analysis Quality:', 'High' if results.get('processed_frames', 0) > 100 else 'Medium']
+            ['Exercise Type:', ctx.exercise_name.replace('_', ' ').title()],
+            ['Session Date:', ctx.session_date],
+            ['Duration:', f"{ctx.duration:.1f} seconds"],
+            ['Total Frames Analyzed:', str(ctx.processed_frames)],
+            ['Analysis Quality:', 'High' if ctx.processed_frames > 100 else 'Medium']
         ]
         
         table = Table(session_data, colWidths=[2*inch, 3*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7'))
-        ]))
+        table.setStyle(self._SESSION_TABLE_STYLE)
         
         content.append(table)
         return content
     
-    def _create_performance_summary(self, results: Dict[str, Any]) -> List:
+    def _create_performance_summary(self, ctx: ReportContext) -> List:
         """Create performance summary section"""
         content = []
         
         content.append(Paragraph("Performance Summary", self.heading_style))
         
         # Calculate metrics
-        total_reps = results.get('total_reps', 0)
-        correct_reps = results.get('correct_reps', 0)
-        accuracy_score = results.get('accuracy_score', 0) * 100
-        calories_burned = results.get('calories_burned', 0)
+        total_reps = ctx.total_reps
+        correct_reps = ctx.correct_reps
+        accuracy_score = ctx.accuracy_pct
+        calories_burned = ctx.calories_burned
         
         # Performance rating
-        if accuracy_score >= 90:
-            rating = "Excellent"
-            rating_color = colors.green
-        elif accuracy_score >= 80:
-            rating = "Good"
-            rating_color = colors.blue
-        elif accuracy_score >= 70:
-            rating = "Fair"
-            rating_color = colors.orange
-        else:
-            rating = "Needs Improvement"
-            rating_color = colors.red
+        rating, table_style = self._RATING_TABLE[bisect.bisect_right(RATING_CUTS, accuracy_score)]
         
         summary_data = [
             ['Total Repetitions:', str(total_reps)],
@@ -174,130 +268,136 @@ class WorkoutReportGenerator:
         ]
         
         table = Table(summary_data, colWidths=[2.5*inch, 2.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#3498db')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.white),
-            ('TEXTCOLOR', (1, 0), (1, -2), colors.black),
-            ('TEXTCOLOR', (1, -1), (1, -1), rating_color),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -2), 'Helvetica'),
-            ('FONTNAME', (1, -1), (1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#2980b9'))
-        ]))
+        table.setStyle(table_style)
         
         content.append(table)
         return content
     
-    def _create_detailed_analysis(self, results: Dict[str, Any]) -> List:
+    def _create_detailed_analysis(self, ctx: ReportContext) -> List:
         """Create detailed analysis section"""
         content = []
         
         content.append(Paragraph("Detailed Analysis", self.heading_style))
         
         # Rep accuracy breakdown
-        total_reps = results.get('total_reps', 0)
-        correct_reps = results.get('correct_reps', 0)
+        total_reps = ctx.total_reps
+        correct_reps = ctx.correct_reps
         
         if total_reps > 0:
             rep_accuracy = (correct_reps / total_reps) * 100
             incorrect_reps = total_reps - correct_reps
             
-            content.append(Paragraph(f"<b>Repetition Analysis:</b>", self.body_style))
-            content.append(Paragraph(f"• {correct_reps} out of {total_reps} repetitions performed with correct form ({rep_accuracy:.1f}%)", self.body_style))
-            
+            rep_lines = [f"{correct_reps} out of {total_reps} repetitions performed with correct form ({rep_accuracy:.1f}%)"]
             if incorrect_reps > 0:
-                content.append(Paragraph(f"• {incorrect_reps} repetitions need form improvement", self.body_style))
+                rep_lines.append(f"{incorrect_reps} repetitions need form improvement")
+            
+            content.append(self._bullet_list(rep_lines, "Repetition Analysis:"))
         
         # Timeline analysis
-        timeline_data = results.get('analysis_timeline', [])
+        timeline_data = ctx.timeline
         if timeline_data:
-            content.append(Paragraph(f"<b>Workout Progression:</b>", self.body_style))
-            content.append(Paragraph(f"• Analysis captured {len(timeline_data)} key moments during your workout", self.body_style))
+            progression_lines = [f"Analysis captured {len(timeline_data)} key moments during your workout"]
             
             # Find best and worst performing moments
             if len(timeline_data) > 1:
-                best_moment = max(timeline_data, key=lambda x: x.get('accuracy_score', 0))
-                worst_moment = min(timeline_data, key=lambda x: x.get('accuracy_score', 1))
+                # One pass for both ends (first entry wins ties, as max/min would)
+                best_moment = worst_moment = timeline_data[0]
+                best_acc = best_moment.get('accuracy_score', 0)
+                worst_acc = worst_moment.get('accuracy_score', 1)
+                for entry in timeline_data:
+                    accuracy = entry.get('accuracy_score')
+                    if (0 if accuracy is None else accuracy) > best_acc:
+                        best_moment, best_acc = entry, accuracy
+                    if (1 if accuracy is None else accuracy) < worst_acc:
+                        worst_moment, worst_acc = entry, accuracy
                 
-                content.append(Paragraph(f"• Best form at {best_moment.get('timestamp', 0):.1f}s with {best_moment.get('accuracy_score', 0)*100:.1f}% accuracy", self.body_style))
-                content.append(Paragraph(f"• Form needs attention around {worst_moment.get('timestamp', 0):.1f}s", self.body_style))
+                progression_lines.append(f"Best form at {best_moment.get('timestamp', 0):.1f}s with {best_moment.get('accuracy_score', 0)*100:.1f}% accuracy")
+                progression_lines.append(f"Form needs attention around {worst_moment.get('timestamp', 0):.1f}s")
+            
+            content.append(self._bullet_list(progression_lines, "Workout Progression:"))
         
         return content
     
-    def _create_form_feedback(self, results: Dict[str, Any]) -> List:
+    def _create_form_feedback(self, ctx: ReportContext) -> List:
         """Create form feedback section"""
         content = []
         
-        feedback_list = results.get('form_feedback', [])
+        feedback_list = ctx.form_feedback
         if feedback_list:
             content.append(Paragraph("Form Feedback", self.heading_style))
             
-            # Remove duplicates and categorize feedback
-            unique_feedback = list(set(feedback_list))
+            # Remove duplicates, keeping first-seen order
+            unique_feedback = dict.fromkeys(feedback_list)
             
-            for feedback in unique_feedback[:10]:  # Limit to top 10 feedback items
-                content.append(Paragraph(f"• {feedback}", self.body_style))
+            # Limit to top 10 feedback items
+            content.append(self._bullet_list(itertools.islice(unique_feedback, 10)))
         
         return content
     
-    def _create_mistakes_section(self, results: Dict[str, Any]) -> List:
+    def _create_mistakes_section(self, ctx: ReportContext) -> List:
         """Create mistakes and improvements section"""
         content = []
         
-        mistakes = results.get('mistakes', [])
+        mistakes = ctx.mistakes
         if mistakes:
             content.append(Paragraph("Areas for Improvement", self.heading_style))
             
-            # Group mistakes by severity
-            high_severity = [m for m in mistakes if m.get('severity') == 'high']
-            medium_severity = [m for m in mistakes if m.get('severity') == 'medium']
-            low_severity = [m for m in mistakes if m.get('severity') == 'low']
+            # Group the first 3 mistakes of each reported severity in one pass
+            high_severity, medium_severity = [], []
+            buckets = {'high': high_severity, 'medium': medium_severity}
+            for mistake in mistakes:
+                bucket = buckets.get(mistake.get('severity'))
+                if bucket is not None and len(bucket) < 3:
+                    bucket.append(mistake)
+                    if len(high_severity) == 3 and len(medium_severity) == 3:
+                        break
             
-            if high_severity:
-                content.append(Paragraph("<b>High Priority Issues:</b>", self.body_style))
-                for mistake in high_severity[:3]:  # Top 3 high priority
-                    timestamp = mistake.get('timestamp', 0)
-                    description = mistake.get('description', 'Unknown issue')
-                    content.append(Paragraph(f"• At {timestamp:.1f}s: {description}", self.body_style))
-            
-            if medium_severity:
-                content.append(Paragraph("<b>Medium Priority Issues:</b>", self.body_style))
-                for mistake in medium_severity[:3]:  # Top 3 medium priority
-                    timestamp = mistake.get('timestamp', 0)
-                    description = mistake.get('description', 'Unknown issue')
-                    content.append(Paragraph(f"• At {timestamp:.1f}s: {description}", self.body_style))
+            for heading, group in (("High Priority Issues:", high_severity), ("Medium Priority Issues:", medium_severity)):
+                if group:
+                    content.append(self._bullet_list(
+                        (f"At {m.get('timestamp', 0):.1f}s: {m.get('description', 'Unknown issue')}" for m in group),
+                        heading
+                    ))
         
         return content
     
-    def _create_timeline_summary(self, results: Dict[str, Any]) -> List:
+    def _create_timeline_summary(self, ctx: ReportContext) -> List:
         """Create timeline summary section"""
         content = []
         
-        timeline_data = results.get('analysis_timeline', [])
+        timeline_data = ctx.timeline
         if len(timeline_data) > 5:  # Only show if we have enough data points
             content.append(Paragraph("Workout Timeline Highlights", self.heading_style))
             
             # Show key moments (every 20% of the workout)
-            total_duration = results.get('duration', 0)
+            total_duration = ctx.duration
             if total_duration > 0:
                 intervals = [0.2, 0.4, 0.6, 0.8, 1.0]
+                highlights = []
+                
+                # Sort once so each interval's closest entry is a binary search
+                timeline_sorted = sorted(timeline_data, key=lambda x: x.get('timestamp', 0))
+                timestamps = [entry.get('timestamp', 0) for entry in timeline_sorted]
                 
                 for interval in intervals:
                     target_time = total_duration * interval
-                    # Find closest timeline entry
-                    closest_entry = min(timeline_data, key=lambda x: abs(x.get('timestamp', 0) - target_time))
+                    # Find closest timeline entry (the earlier one on a tie)
+                    i = bisect.bisect_left(timestamps, target_time)
+                    if i == len(timestamps) or (i > 0 and target_time - timestamps[i - 1] <= timestamps[i] - target_time):
+                        i -= 1
+                    closest_entry = timeline_sorted[i]
                     
                     timestamp = closest_entry.get('timestamp', 0)
                     rep_count = closest_entry.get('rep_count', 0)
                     accuracy = closest_entry.get('accuracy_score', 0) * 100
                     
-                    content.append(Paragraph(f"• {timestamp:.1f}s: Rep {rep_count}, Accuracy {accuracy:.1f}%", self.body_style))
+                    highlights.append(f"{timestamp:.1f}s: Rep {rep_count}, Accuracy {accuracy:.1f}%")
+                
+                content.append(self._bullet_list(highlights))
         
         return content
     
-    def _create_recommendations(self, results: Dict[str, Any]) -> List:
+    def _create_recommendations(self, ctx: ReportContext) -> List:
         """Create recommendations section"""
         content = []
         
@@ -306,9 +406,9 @@ class WorkoutReportGenerator:
         # Generate recommendations based on analysis
         recommendations = []
         
-        accuracy_score = results.get('accuracy_score', 0) * 100
-        total_reps = results.get('total_reps', 0)
-        correct_reps = results.get('correct_reps', 0)
+        accuracy_score = ctx.accuracy_pct
+        total_reps = ctx.total_reps
+        correct_reps = ctx.correct_reps
         
         if accuracy_score < 70:
             recommendations.append("Focus on form quality over quantity. Consider reducing speed to maintain proper technique.")
@@ -316,50 +416,92 @@ class WorkoutReportGenerator:
         if total_reps > 0 and (correct_reps / total_reps) < 0.8:
             recommendations.append("Practice the exercise with lighter resistance or assistance to perfect your form.")
         
-        mistakes = results.get('mistakes', [])
+        mistakes = ctx.mistakes
         if len(mistakes) > 5:
             recommendations.append("Consider working with a trainer to address recurring form issues.")
         
         # Exercise-specific recommendations
-        exercise_name = results.get('exercise_name', '').lower()
-        if 'push_up' in exercise_name:
-            recommendations.append("Focus on keeping your body in a straight line and controlling the descent.")
-        elif 'squat' in exercise_name:
-            recommendations.append("Ensure your knees track over your toes and maintain an upright torso.")
-        elif 'bicep' in exercise_name:
-            recommendations.append("Keep your elbows stable at your sides and control the weight throughout the full range of motion.")
+        exercise_recommendation = _exercise_recommendation(ctx.exercise_name)
+        if exercise_recommendation is not None:
+            recommendations.append(exercise_recommendation)
         
         # Default recommendations
         if not recommendations:
             recommendations.append("Great job! Continue practicing to maintain and improve your form.")
             recommendations.append("Consider gradually increasing intensity as your form remains consistent.")
         
-        for rec in recommendations:
-            content.append(Paragraph(f"• {rec}", self.body_style))
+        content.append(self._bullet_list(recommendations))
         
         # Footer
         content.append(Spacer(1, 30))
-        content.append(Paragraph("Generated by Workout Analyzer AI", 
-                                ParagraphStyle('Footer', parent=self.styles['Normal'], 
-                                             fontSize=8, textColor=colors.grey, alignment=1)))
+        content.append(Paragraph("Generated by Workout Analyzer AI", self.footer_style))
         
         return content
+    
+    # (include predicate, builder) per report section, in page order
+    _SECTIONS = (
+        (lambda ctx: True, _create_session_info),
+        (lambda ctx: True, _create_performance_summary),
+        (lambda ctx: ctx.total_reps > 0 or ctx.timeline, _create_detailed_analysis),
+        (lambda ctx: ctx.form_feedback, _create_form_feedback),
+        (lambda ctx: ctx.mistakes, _create_mistakes_section),
+        (lambda ctx: len(ctx.timeline) > 5 and ctx.duration > 0, _create_timeline_summary),
+        (lambda ctx: True, _create_recommendations),
+    )
 
 # Global instance
 report_generator = WorkoutReportGenerator()
 
-async def generate_workout_report(analysis_results: Dict[str, Any]) -> BytesIO:
+# Dedicated threads for PDF builds, so long reports do not tie up the event loop's default executor
+_REPORT_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix='report')
+
+# Recently generated PDFs by content hash, so repeated downloads skip the build
+REPORT_CACHE_SIZE = 32
+_report_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def _report_cache_key(analysis_results: Dict[str, Any]) -> str:
+    """Stable hash of the results (and today's date, which the report prints)"""
+    payload = json.dumps(analysis_results, sort_keys=True, default=str).encode()
+    digest = hashlib.blake2b(payload, digest_size=16)
+    digest.update(datetime.now().strftime('%Y-%m-%d').encode())
+    return digest.hexdigest()
+
+def _generate_cached(analysis_results: Dict[str, Any], key: str) -> bytes:
+    buffer = report_generator.generate_report(analysis_results)
+    data = buffer.getvalue()
+    with _report_cache_lock:
+        _report_cache[key] = data
+        if len(_report_cache) > REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return data
+
+async def generate_workout_report(analysis_results: Dict[str, Any], out: Optional[BinaryIO] = None) -> BinaryIO:
     """
     Generate workout analysis PDF report
     
+    The CPU-bound layout runs on the report thread pool so the event loop keeps serving other requests,
+    and identical results requested again on the same day are served from a small cache of recent PDFs.
+    
     Args:
         analysis_results: Analysis results dictionary
+        out: Optional writable binary stream to write the PDF to
         
     Returns:
-        BytesIO containing the PDF report
+        The stream containing the PDF report (a BytesIO unless out is given)
     """
-    try:
-        return report_generator.generate_report(analysis_results)
-    except Exception as e:
-        logger.error(f"Error generating workout report: {e}")
-        raise
\ No newline at end of file
+    key = _report_cache_key(analysis_results)
+    with _report_cache_lock:
+        data = _report_cache.get(key)
+        if data is not None:
+            _report_cache.move_to_end(key)
+    
+    if data is None:
+        data = await asyncio.get_running_loop().run_in_executor(
+            _REPORT_POOL, _generate_cached, analysis_results, key
+        )
+    
+    if out is None:
+        return BytesIO(data)
+    out.write(data)
+    return out
\ No newline at end of file
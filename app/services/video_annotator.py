@@ -1,9 +1,14 @@
 """
 Video Annotator Service - Creates annotated workout videos with analysis overlay
 """
+import asyncio
+import functools
+import subprocess
 import cv2
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
 from datetime import datetime
 import tempfile
@@ -14,6 +19,162 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Frames buffered between pipeline stages (capture -> inference -> draw + write)
+PIPELINE_DEPTH = 4
+
+# Joints drawn on the skeleton, and the connections between them as index pairs into SKELETON_JOINTS
+SKELETON_JOINTS = (
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle'
+)
+SKELETON_CONNECTIONS = np.array([
+    (SKELETON_JOINTS.index(start), SKELETON_JOINTS.index(end))
+    for start, end in (
+        # Torso
+        ('left_shoulder', 'right_shoulder'),
+        ('left_shoulder', 'left_hip'),
+        ('right_shoulder', 'right_hip'),
+        ('left_hip', 'right_hip'),
+        # Left arm
+        ('left_shoulder', 'left_elbow'),
+        ('left_elbow', 'left_wrist'),
+        # Right arm
+        ('right_shoulder', 'right_elbow'),
+        ('right_elbow', 'right_wrist'),
+        # Left leg
+        ('left_hip', 'left_knee'),
+        ('left_knee', 'left_ankle'),
+        # Right leg
+        ('right_hip', 'right_knee'),
+        ('right_knee', 'right_ankle')
+    )
+], dtype=np.intp)
+
+# Sampled frames per inference call when the pose backend batches (ONNX / TensorRT)
+INFER_BATCH_SIZE = 8
+
+# Feedback wording that selects the positive (green) and caution (yellow) label colors; anything else is red
+POSITIVE_FEEDBACK_WORDS = ('good', 'great', 'excellent', 'perfect')
+CAUTION_FEEDBACK_WORDS = ('keep', 'maintain', 'watch')
+
+# Distinct feedback strings whose label colors are remembered
+FEEDBACK_COLOR_CACHE_SIZE = 512
+
+# ffmpeg H.264 encoder arguments at roughly CRF 23 quality, in auto-selection order (hardware first)
+VIDEO_ENCODER_ARGS = {
+    'h264_nvenc': ['-c:v', 'h264_nvenc', '-preset', 'p4', '-tune', 'll', '-rc', 'vbr', '-cq', '23'],
+    'h264_qsv': ['-c:v', 'h264_qsv', '-preset', 'medium', '-global_quality', '23'],
+    'h264_amf': ['-c:v', 'h264_amf', '-quality', 'balanced', '-rc', 'cqp', '-qp_i', '23', '-qp_p', '23'],
+    'libx264': ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23'],
+}
+
+def _open_video(path: str) -> cv2.VideoCapture:
+    """Open a video file with the FFmpeg backend (skipping backend auto-probing) and a one-frame buffer"""
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        # OpenCV built without FFmpeg: let it pick a backend
+        cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+@functools.lru_cache(maxsize=None)
+def _encoder_works(encoder: str) -> bool:
+    """Whether ffmpeg can encode with this encoder here (hardware encoders are listed even without the device)"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+             '-frames:v', '1', *VIDEO_ENCODER_ARGS[encoder], '-f', 'null', '-'],
+            capture_output=True, timeout=15
+        )
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+def _select_video_encoder() -> str:
+    """The configured VIDEO_ENCODER, or with auto the first encoder that works on this machine"""
+    encoder = settings.VIDEO_ENCODER
+    if encoder in VIDEO_ENCODER_ARGS:
+        return encoder
+    if encoder != 'auto':
+        logger.warning(f"Unknown VIDEO_ENCODER {encoder!r}, using libx264")
+        return 'libx264'
+    
+    encoder = next((name for name in VIDEO_ENCODER_ARGS if name == 'libx264' or _encoder_works(name)), 'libx264')
+    logger.info(f"Using {encoder} for annotated video encoding")
+    return encoder
+
+class OverlayCache:
+    """
+    Rendered overlay elements of one video, blitted onto frames instead of redrawn
+    
+    Each element is drawn once onto a black and a white canvas; the pixels that come out
+    the same on both are the element's own, and only that patch and mask are kept.
+    Elements must be opaque (boxes with borders, text on a filled background).
+    """
+    
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._shape = None
+        self._patches: OrderedDict = OrderedDict()
+    
+    def blit(self, frame: np.ndarray, key, draw: Callable[[np.ndarray], object]):
+        """Copy the element cached under key onto frame, rendering it with draw(canvas) on first use"""
+        self._paste(frame, self._entry(frame, key, draw), 0, 0)
+    
+    def stamp(self, frame: np.ndarray, key, position: Tuple[int, int], draw: Callable[[np.ndarray, Tuple[int, int]], object]):
+        """Like blit for elements that move: draw(canvas, position) is rendered once and copied to any position"""
+        x, y = position
+        self._paste(frame, self._entry(frame, key, draw, (frame.shape[1] // 2, frame.shape[0] // 2)), y, x)
+    
+    def _entry(self, frame: np.ndarray, key, draw: Callable, *args):
+        if frame.shape != self._shape:
+            self._shape = frame.shape
+            self._patches.clear()
+        
+        entry = self._patches.get(key)
+        if entry is None:
+            entry = self._patches[key] = self._render(draw, *args)
+            if len(self._patches) > self.maxsize:
+                self._patches.popitem(last=False)
+        else:
+            self._patches.move_to_end(key)
+        return entry
+    
+    def _render(self, draw: Callable, anchor: Optional[Tuple[int, int]] = None):
+        on_black = np.zeros(self._shape, dtype=np.uint8)
+        on_white = np.full(self._shape, 255, dtype=np.uint8)
+        args = () if anchor is None else (anchor,)
+        draw(on_black, *args)
+        draw(on_white, *args)
+        
+        drawn = (on_black == on_white).all(axis=2)
+        rows = np.flatnonzero(drawn.any(axis=1))
+        cols = np.flatnonzero(drawn.any(axis=0))
+        if not len(rows):
+            return None
+        
+        # Patch offset is relative to the anchor it was drawn at (the frame origin for blit)
+        anchor_x, anchor_y = anchor or (0, 0)
+        y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        return (y0 - anchor_y, x0 - anchor_x,
+                on_black[y0:y1, x0:x1].copy(), drawn[y0:y1, x0:x1, np.newaxis].copy())
+    
+    @staticmethod
+    def _paste(frame: np.ndarray, entry, y: int, x: int):
+        if entry is None:
+            return
+        dy, dx, patch, mask = entry
+        y, x = y + dy, x + dx
+        
+        # Clip to the frame, as drawing the element there would
+        height, width = patch.shape[:2]
+        top, left = max(-y, 0), max(-x, 0)
+        bottom, right = min(height, frame.shape[0] - y), min(width, frame.shape[1] - x)
+        if top < bottom and left < right:
+            np.copyto(frame[y + top:y + bottom, x + left:x + right],
+                      patch[top:bottom, left:right], where=mask[top:bottom, left:right])
+
 class VideoAnnotator:
     """
     Creates annotated videos with:
@@ -40,6 +201,9 @@ class VideoAnnotator:
         self.FONT_SCALE_SMALL = 0.6
         self.FONT_THICKNESS_BOLD = 3
         self.FONT_THICKNESS_NORMAL = 2
+        
+        # (text color, background color) per feedback message, see _feedback_colors
+        self._feedback_color_cache: Dict[str, Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = {}
     
     async def create_annotated_video(
         self, 
@@ -130,7 +294,7 @@ class VideoAnnotator:
         
         try:
             # Open input video
-            cap = cv2.VideoCapture(input_video_path)
+            cap = _open_video(input_video_path)
             
             if not cap.isOpened():
                 raise Exception("Could not open input video")
@@ -185,71 +349,18 @@ class VideoAnnotator:
             if out is None or not out.isOpened():
                 raise Exception("Could not create output video writer with any codec")
             
-            # Processing state
-            frame_count = 0
-            correct_reps = 0
-            incorrect_reps = 0
-            current_feedback = []
-            last_rep_count = 0
-            
             logger.info("Starting frame-by-frame annotation...")
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                
-                # Process frame with MediaPipe
-                analysis_result = mediapipe_service.process_frame(frame, exercise_name, session_id)
-                
-                if analysis_result:
-                    # Check if new rep was completed
-                    if analysis_result.rep_count > last_rep_count:
-                        # Determine if rep was correct based on accuracy
-                        if analysis_result.accuracy_score >= 0.7:
-                            correct_reps += 1
-                        else:
-                            incorrect_reps += 1
-                        last_rep_count = analysis_result.rep_count
-                    
-                    # Update feedback
-                    current_feedback = analysis_result.form_feedback[-3:] if analysis_result.form_feedback else []
-                    
-                    # Draw skeleton overlay
-                    frame = self._draw_skeleton(frame, analysis_result.landmarks)
-                    
-                    # Draw angle indicators for key joints
-                    frame = self._draw_angle_indicators(frame, analysis_result.angle_data, analysis_result.landmarks)
-                
-                # Draw rep counters (top right)
-                frame = self._draw_rep_counters(frame, correct_reps, incorrect_reps)
-                
-                # Draw feedback (top left)
-                frame = self._draw_feedback(frame, current_feedback)
-                
-                # Draw progress bar at bottom
-                frame = self._draw_progress_bar(frame, frame_count, total_frames)
-                
+            def write_frame(frame: np.ndarray):
                 # Ensure frame dimensions match output video
                 if frame.shape[1] != width or frame.shape[0] != height:
                     frame = cv2.resize(frame, (width, height))
-                
-                # Write annotated frame
-                success = out.write(frame)
-                
-                if not success:
-                    logger.warning(f"Failed to write frame {frame_count}")
-                
-                # Progress callback
-                if progress_callback and frame_count % 30 == 0:  # Update every 30 frames
-                    progress = int((frame_count / total_frames) * 100)
-                    await progress_callback(progress, f"Annotating frame {frame_count}/{total_frames}")
-                
-                # Log progress periodically
-                if frame_count % 100 == 0:
-                    logger.info(f"Annotated {frame_count}/{total_frames} frames ({frame_count/total_frames*100:.1f}%)")
+                out.write(frame)
+            
+            frame_count, correct_reps, incorrect_reps = await self._run_annotation_pipeline(
+                cap, write_frame, exercise_name, session_id, total_frames, progress_callback,
+                infer_stride=self._inference_stride(fps)
+            )
             
             # Release resources
             cap.release()
@@ -266,7 +377,7 @@ class VideoAnnotator:
             logger.info(f"Output video created: {output_video_path} ({file_size / (1024*1024):.2f} MB)")
             
             # Verify video can be opened
-            verify_cap = cv2.VideoCapture(output_video_path)
+            verify_cap = _open_video(output_video_path)
             if not verify_cap.isOpened():
                 verify_cap.release()
                 raise Exception("Output video cannot be opened for verification")
@@ -304,6 +415,173 @@ class VideoAnnotator:
             except:
                 pass
     
+    def _inference_stride(self, fps: float) -> int:
+        """Frames per pose inference that bring fps down to about ANNOTATION_INFER_FPS"""
+        target = settings.ANNOTATION_INFER_FPS
+        if target <= 0 or fps <= target:
+            return 1
+        return max(1, round(fps / target))
+    
+    async def _run_annotation_pipeline(
+        self,
+        cap: cv2.VideoCapture,
+        write_frame: Callable[[np.ndarray], None],
+        exercise_name: str,
+        session_id: str,
+        total_frames: int,
+        progress_callback: Optional[Callable[[int, str], Awaitable]] = None,
+        infer_stride: int = 1
+    ) -> Tuple[int, int, int]:
+        """
+        Annotate every frame of cap and hand it to write_frame, overlapping the stages
+        
+        Capture, MediaPipe inference and draw + write each run on their own thread,
+        connected by bounded queues, so per-frame time approaches the slowest stage
+        rather than the sum of all three. Each stage is a single thread: inference
+        must see frames in order on one thread (the Pose tracker is per thread and
+        rep counting is sequential), and the writer must emit them in order.
+        
+        Pose inference runs on every infer_stride-th frame; the frames in between
+        are drawn with the last analysis. When the pose backend batches, sampled
+        frames are collected into batches of INFER_BATCH_SIZE per inference call.
+        
+        Returns:
+            (frames annotated, correct reps, incorrect reps)
+        """
+        loop = asyncio.get_running_loop()
+        captured: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        analyzed: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        # Frames already written, recycled as decode targets instead of allocating new ones
+        spare_frames: deque = deque()
+        
+        capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='annotate-capture')
+        infer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='annotate-infer')
+        draw_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='annotate-draw')
+        
+        def read_frame():
+            ret, frame = cap.read(spare_frames.popleft() if spare_frames else None)
+            return frame if ret else None
+        
+        async def capture():
+            while (frame := await loop.run_in_executor(capture_pool, read_frame)) is not None:
+                await captured.put(frame)
+            await captured.put(None)
+        
+        batch_size = INFER_BATCH_SIZE if mediapipe_service.supports_batching else 1
+        
+        async def infer():
+            index = 0
+            analysis_result = None
+            # Frames waiting for the current batch, flagged when they are sampled for inference
+            pending: List[Tuple[np.ndarray, bool]] = []
+            sampled = 0
+            
+            async def flush():
+                nonlocal analysis_result, sampled
+                results = iter(await loop.run_in_executor(
+                    infer_pool, mediapipe_service.process_frames,
+                    [frame for frame, is_sampled in pending if is_sampled], exercise_name, session_id
+                ))
+                for frame, is_sampled in pending:
+                    if is_sampled:
+                        analysis_result = next(results)
+                    await analyzed.put((frame, analysis_result))
+                pending.clear()
+                sampled = 0
+            
+            while (frame := await captured.get()) is not None:
+                is_sampled = index % infer_stride == 0
+                index += 1
+                pending.append((frame, is_sampled))
+                sampled += is_sampled
+                if sampled == batch_size:
+                    await flush()
+            
+            if pending:
+                await flush()
+            await analyzed.put(None)
+        
+        # Counters, feedback, the progress bar frame and angle labels take few distinct values, so they are blitted from a cache
+        overlays = OverlayCache()
+        
+        def draw_and_write(frame, analysis_result, current_feedback, correct_reps, incorrect_reps, frame_count):
+            source = frame
+            if analysis_result:
+                # Draw skeleton overlay
+                frame = self._draw_skeleton(frame, analysis_result.landmarks)
+                
+                # Draw angle indicators for key joints
+                frame = self._draw_angle_indicators(frame, analysis_result.angle_data, analysis_result.landmarks, overlays)
+            
+            # Draw rep counters (top right)
+            overlays.blit(frame, ('counters', correct_reps, incorrect_reps),
+                          lambda canvas: self._draw_rep_counters(canvas, correct_reps, incorrect_reps))
+            
+            # Draw feedback (top left)
+            overlays.blit(frame, ('feedback', tuple(current_feedback)),
+                          lambda canvas: self._draw_feedback(canvas, current_feedback))
+            
+            # Draw progress bar at bottom: cached empty bar, then the live fill inside its border
+            overlays.blit(frame, ('progress',), lambda canvas: self._draw_progress_bar(canvas, 0, total_frames))
+            self._draw_progress_fill(frame, frame_count, total_frames)
+            
+            write_frame(frame)
+            spare_frames.append(source)
+        
+        async def draw():
+            frame_count = 0
+            correct_reps = 0
+            incorrect_reps = 0
+            current_feedback = []
+            last_rep_count = 0
+            
+            while (item := await analyzed.get()) is not None:
+                frame, analysis_result = item
+                frame_count += 1
+                
+                if analysis_result:
+                    # Check if new rep was completed
+                    if analysis_result.rep_count > last_rep_count:
+                        # Determine if rep was correct based on accuracy
+                        if analysis_result.accuracy_score >= 0.7:
+                            correct_reps += 1
+                        else:
+                            incorrect_reps += 1
+                        last_rep_count = analysis_result.rep_count
+                    
+                    # Update feedback
+                    current_feedback = analysis_result.form_feedback[-3:] if analysis_result.form_feedback else []
+                
+                await loop.run_in_executor(
+                    draw_pool, draw_and_write,
+                    frame, analysis_result, current_feedback, correct_reps, incorrect_reps, frame_count
+                )
+                
+                # Progress callback
+                if progress_callback and frame_count % 30 == 0:  # Update every 30 frames
+                    progress = int((frame_count / total_frames) * 100)
+                    await progress_callback(progress, f"Annotating frame {frame_count}/{total_frames}")
+                
+                # Log progress periodically
+                if frame_count % 100 == 0:
+                    logger.info(f"Annotated {frame_count}/{total_frames} frames ({frame_count/total_frames*100:.1f}%)")
+            
+            return frame_count, correct_reps, incorrect_reps
+        
+        tasks = [asyncio.ensure_future(stage()) for stage in (capture, infer, draw)]
+        try:
+            *_, counts = await asyncio.gather(*tasks)
+            return counts
+        except BaseException:
+            # A failed stage would leave the others blocked on their queues
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            for pool in (capture_pool, infer_pool, draw_pool):
+                pool.shutdown(wait=True)
+    
     def _draw_skeleton(self, frame: np.ndarray, landmarks: Dict) -> np.ndarray:
         """Draw skeleton overlay on frame"""
         if not landmarks:
@@ -311,60 +589,39 @@ class VideoAnnotator:
         
         height, width = frame.shape[:2]
         
-        # Define skeleton connections
-        connections = [
-            # Torso
-            ('left_shoulder', 'right_shoulder'),
-            ('left_shoulder', 'left_hip'),
-            ('right_shoulder', 'right_hip'),
-            ('left_hip', 'right_hip'),
-            # Left arm
-            ('left_shoulder', 'left_elbow'),
-            ('left_elbow', 'left_wrist'),
-            # Right arm
-            ('right_shoulder', 'right_elbow'),
-            ('right_elbow', 'right_wrist'),
-            # Left leg
-            ('left_hip', 'left_knee'),
-            ('left_knee', 'left_ankle'),
-            # Right leg
-            ('right_hip', 'right_knee'),
-            ('right_knee', 'right_ankle')
-        ]
-        
-        # Draw connections (lines)
-        for start_name, end_name in connections:
-            if start_name in landmarks and end_name in landmarks:
-                start_landmark = landmarks[start_name]
-                end_landmark = landmarks[end_name]
-                
-                if start_landmark.visibility > 0.5 and end_landmark.visibility > 0.5:
-                    start_point = (int(start_landmark.x * width), int(start_landmark.y * height))
-                    end_point = (int(end_landmark.x * width), int(end_landmark.y * height))
-                    
-                    # Draw line with glow effect
-                    cv2.line(frame, start_point, end_point, (0, 0, 0), 6)  # Black outline
-                    cv2.line(frame, start_point, end_point, self.COLOR_SKELETON, 3)  # Yellow line
-        
-        # Draw joints (circles)
-        key_joints = ['left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow', 
-                      'left_wrist', 'right_wrist', 'left_hip', 'right_hip', 
-                      'left_knee', 'right_knee', 'left_ankle', 'right_ankle']
-        
-        for joint_name in key_joints:
-            if joint_name in landmarks:
-                landmark = landmarks[joint_name]
-                if landmark.visibility > 0.5:
-                    point = (int(landmark.x * width), int(landmark.y * height))
-                    # Draw circle with glow effect
-                    cv2.circle(frame, point, 8, (0, 0, 0), -1)  # Black outline
-                    cv2.circle(frame, point, 6, self.COLOR_JOINT, -1)  # Magenta fill
-                    cv2.circle(frame, point, 6, (255, 255, 255), 1)  # White border
+        # Pixel position and visibility per skeleton joint, converted in one pass (missing joints stay invisible)
+        values = np.zeros((len(SKELETON_JOINTS), 3), dtype=np.float64)
+        for idx, name in enumerate(SKELETON_JOINTS):
+            landmark = landmarks.get(name)
+            if landmark is not None:
+                values[idx] = (landmark.x, landmark.y, landmark.visibility)
+        pixels = (values[:, :2] * (width, height)).astype(np.int32)
+        visible = values[:, 2] > 0.5
+        
+        # Draw connections whose two ends are visible (lines with glow effect), one call per layer
+        connections = SKELETON_CONNECTIONS[visible[SKELETON_CONNECTIONS].all(axis=1)]
+        if len(connections):
+            segments = list(pixels[connections])
+            cv2.polylines(frame, segments, False, (0, 0, 0), 6)  # Black outline
+            cv2.polylines(frame, segments, False, self.COLOR_SKELETON, 3)  # Yellow line
+        
+        # Draw joints (circles with glow effect)
+        for point in pixels[visible].tolist():
+            point = tuple(point)
+            cv2.circle(frame, point, 8, (0, 0, 0), -1)  # Black outline
+            cv2.circle(frame, point, 6, self.COLOR_JOINT, -1)  # Magenta fill
+            cv2.circle(frame, point, 6, (255, 255, 255), 1)  # White border
         
         return frame
     
-    def _draw_angle_indicators(self, frame: np.ndarray, angle_data: Dict, landmarks: Dict) -> np.ndarray:
-        """Draw angle indicators at key joints"""
+    def _draw_angle_indicators(
+        self,
+        frame: np.ndarray,
+        angle_data: Dict,
+        landmarks: Dict,
+        overlays: Optional[OverlayCache] = None
+    ) -> np.ndarray:
+        """Draw angle indicators at key joints, stamping the labels from overlays when given"""
         if not angle_data or not landmarks:
             return frame
         
@@ -378,8 +635,7 @@ class VideoAnnotator:
                 if landmark.visibility > 0.5:
                     point = (int(landmark.x * width) + 20, int(landmark.y * height))
                     angle_text = f"{int(angle_data['elbow_angle'])}°"
-                    self._draw_text_with_background(frame, angle_text, point, 
-                                                   self.FONT_SCALE_SMALL, (255, 255, 0))
+                    self._draw_angle_label(frame, angle_text, point, overlays)
         
         if 'knee_angle' in angle_data:
             # Draw knee angle
@@ -388,9 +644,24 @@ class VideoAnnotator:
                 if landmark.visibility > 0.5:
                     point = (int(landmark.x * width) + 20, int(landmark.y * height))
                     angle_text = f"{int(angle_data['knee_angle'])}°"
-                    self._draw_text_with_background(frame, angle_text, point, 
-                                                   self.FONT_SCALE_SMALL, (255, 255, 0))
+                    self._draw_angle_label(frame, angle_text, point, overlays)
+        
+        return frame
+    
+    def _draw_angle_label(
+        self,
+        frame: np.ndarray,
+        text: str,
+        point: Tuple[int, int],
+        overlays: Optional[OverlayCache] = None
+    ) -> np.ndarray:
+        """Draw one angle label at point"""
+        if overlays is None:
+            return self._draw_text_with_background(frame, text, point, self.FONT_SCALE_SMALL, (255, 255, 0))
         
+        overlays.stamp(frame, ('angle', text), point,
+                       lambda canvas, anchor: self._draw_text_with_background(
+                           canvas, text, anchor, self.FONT_SCALE_SMALL, (255, 255, 0)))
         return frame
     
     def _draw_rep_counters(self, frame: np.ndarray, correct: int, incorrect: int) -> np.ndarray:
@@ -437,15 +708,7 @@ class VideoAnnotator:
                 feedback = feedback[:27] + "..."
             
             # Determine color based on feedback content
-            if any(word in feedback.lower() for word in ['good', 'great', 'excellent', 'perfect']):
-                color = self.COLOR_CORRECT
-                bg_color = (0, 100, 0)
-            elif any(word in feedback.lower() for word in ['keep', 'maintain', 'watch']):
-                color = (0, 255, 255)  # Yellow
-                bg_color = (0, 100, 100)
-            else:
-                color = self.COLOR_INCORRECT
-                bg_color = (0, 0, 100)
+            color, bg_color = self._feedback_colors(feedback)
             
             self._draw_text_with_background(
                 frame, feedback, (x_offset, y_offset + (i * 50)),
@@ -455,8 +718,27 @@ class VideoAnnotator:
         
         return frame
     
-    def _draw_progress_bar(self, frame: np.ndarray, current_frame: int, total_frames: int) -> np.ndarray:
-        """Draw progress bar at bottom of frame"""
+    def _feedback_colors(self, feedback: str) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+        """Label colors for a feedback message, classified once per distinct message"""
+        colors = self._feedback_color_cache.get(feedback)
+        if colors is not None:
+            return colors
+        
+        lowered = feedback.lower()
+        if any(word in lowered for word in POSITIVE_FEEDBACK_WORDS):
+            colors = (self.COLOR_CORRECT, (0, 100, 0))
+        elif any(word in lowered for word in CAUTION_FEEDBACK_WORDS):
+            colors = ((0, 255, 255), (0, 100, 100))  # Yellow
+        else:
+            colors = (self.COLOR_INCORRECT, (0, 0, 100))
+        
+        if len(self._feedback_color_cache) >= FEEDBACK_COLOR_CACHE_SIZE:
+            self._feedback_color_cache.clear()
+        self._feedback_color_cache[feedback] = colors
+        return colors
+    
+    def _progress_bar_geometry(self, frame: np.ndarray, current_frame: int, total_frames: int) -> Tuple[int, int, int, int, int]:
+        """(x, y, width, height, filled width) of the progress bar"""
         height, width = frame.shape[:2]
         
         # Progress bar dimensions
@@ -468,6 +750,23 @@ class VideoAnnotator:
         # Calculate progress
         progress = current_frame / total_frames if total_frames > 0 else 0
         filled_width = int(bar_width * progress)
+        return bar_x_start, bar_y, bar_width, bar_height, filled_width
+    
+    def _draw_progress_fill(self, frame: np.ndarray, current_frame: int, total_frames: int) -> np.ndarray:
+        """Draw only the filled portion, inside the 2px border of a bar drawn by _draw_progress_bar"""
+        bar_x_start, bar_y, bar_width, bar_height, filled_width = self._progress_bar_geometry(frame, current_frame, total_frames)
+        
+        # Same pixels as filling before drawing the border
+        if filled_width >= 2:
+            cv2.rectangle(frame, (bar_x_start + 2, bar_y + 2),
+                         (min(bar_x_start + filled_width, bar_x_start + bar_width - 2), bar_y + bar_height - 2),
+                         (0, 255, 0), -1)
+        
+        return frame
+    
+    def _draw_progress_bar(self, frame: np.ndarray, current_frame: int, total_frames: int) -> np.ndarray:
+        """Draw progress bar at bottom of frame"""
+        bar_x_start, bar_y, bar_width, bar_height, filled_width = self._progress_bar_geometry(frame, current_frame, total_frames)
         
         # Draw background bar
         cv2.rectangle(frame, (bar_x_start, bar_y), 
@@ -541,15 +840,16 @@ class VideoAnnotator:
         progress_callback=None
     ) -> Dict:
         """
-        Simpler video annotation method using raw frame writing
+        Simpler video annotation method piping raw annotated frames into FFmpeg
         """
         logger.info(f"Using simple annotation method for session {session_id}")
         
+        cap = None
+        proc = None
+        out = None
         try:
-            import subprocess
-            
             # Open input video
-            cap = cv2.VideoCapture(input_video_path)
+            cap = _open_video(input_video_path)
             if not cap.isOpened():
                 raise Exception("Could not open input video")
             
@@ -562,69 +862,22 @@ class VideoAnnotator:
             if fps <= 0:
                 fps = 30
             
-            # Create temporary directory for frames
-            import tempfile
-            temp_dir = tempfile.mkdtemp()
-            frames_dir = os.path.join(temp_dir, "frames")
-            os.makedirs(frames_dir, exist_ok=True)
-            
-            logger.info(f"Processing frames to {frames_dir}")
+            # Ensure dimensions are even numbers (required by yuv420p)
+            width -= width % 2
+            height -= height % 2
             
-            # Process and save frames
-            frame_count = 0
-            correct_reps = 0
-            incorrect_reps = 0
-            current_feedback = []
-            last_rep_count = 0
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                
-                # Process frame with MediaPipe
-                analysis_result = mediapipe_service.process_frame(frame, exercise_name, session_id)
-                
-                if analysis_result:
-                    if analysis_result.rep_count > last_rep_count:
-                        if analysis_result.accuracy_score >= 0.7:
-                            correct_reps += 1
-                        else:
-                            incorrect_reps += 1
-                        last_rep_count = analysis_result.rep_count
-                    
-                    current_feedback = analysis_result.form_feedback[-3:] if analysis_result.form_feedback else []
-                    frame = self._draw_skeleton(frame, analysis_result.landmarks)
-                    frame = self._draw_angle_indicators(frame, analysis_result.angle_data, analysis_result.landmarks)
-                
-                frame = self._draw_rep_counters(frame, correct_reps, incorrect_reps)
-                frame = self._draw_feedback(frame, current_feedback)
-                frame = self._draw_progress_bar(frame, frame_count, total_frames)
-                
-                # Save frame as image
-                frame_path = os.path.join(frames_dir, f"frame_{frame_count:06d}.jpg")
-                cv2.imwrite(frame_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-                
-                if progress_callback and frame_count % 30 == 0:
-                    progress = int((frame_count / total_frames) * 100)
-                    await progress_callback(progress, f"Processing frame {frame_count}/{total_frames}")
-            
-            cap.release()
-            mediapipe_service.reset_session(session_id)
-            
-            logger.info(f"Processed {frame_count} frames, creating video with FFmpeg...")
-            
-            # Use FFmpeg to create video from frames
+            # Encode raw BGR frames straight from stdin (no intermediate images on disk)
+            encoder = _select_video_encoder()
             ffmpeg_cmd = [
                 'ffmpeg',
                 '-y',  # Overwrite output
-                '-framerate', str(fps),
-                '-i', os.path.join(frames_dir, 'frame_%06d.jpg'),
-                '-c:v', 'libx264',  # H.264 codec
-                '-preset', 'medium',  # Encoding speed/quality balance
-                '-crf', '23',  # Quality (lower = better, 18-28 is good range)
+                '-loglevel', 'error',
+                '-f', 'rawvideo',
+                '-pix_fmt', 'bgr24',
+                '-s', f'{width}x{height}',
+                '-r', str(fps),
+                '-i', '-',
+                *VIDEO_ENCODER_ARGS[encoder],  # H.264 codec
                 '-pix_fmt', 'yuv420p',  # Pixel format for compatibility
                 '-movflags', '+faststart',  # Enable streaming
                 output_video_path
@@ -632,17 +885,13 @@ class VideoAnnotator:
             
             try:
                 logger.info(f"Running FFmpeg: {' '.join(ffmpeg_cmd)}")
-                result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=300)
-                
-                if result.returncode != 0:
-                    logger.error(f"FFmpeg stderr: {result.stderr}")
-                    raise Exception(f"FFmpeg failed with code {result.returncode}")
+                proc = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
                 
-                logger.info("FFmpeg completed successfully")
-                
-            except subprocess.TimeoutExpired:
-                logger.error("FFmpeg timed out after 5 minutes")
-                raise Exception("FFmpeg processing timed out")
+                def write_frame(frame: np.ndarray):
+                    if frame.shape[1] != width or frame.shape[0] != height:
+                        frame = cv2.resize(frame, (width, height))
+                    proc.stdin.write(np.ascontiguousarray(frame).data)
+            
             except FileNotFoundError:
                 logger.error("FFmpeg not found, trying OpenCV VideoWriter with different settings")
                 
@@ -650,18 +899,36 @@ class VideoAnnotator:
                 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
                 out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
                 
-                for i in range(1, frame_count + 1):
-                    frame_path = os.path.join(frames_dir, f"frame_{i:06d}.jpg")
-                    frame = cv2.imread(frame_path)
-                    if frame is not None:
-                        out.write(frame)
+                def write_frame(frame: np.ndarray):
+                    if frame.shape[1] != width or frame.shape[0] != height:
+                        frame = cv2.resize(frame, (width, height))
+                    out.write(frame)
+            
+            frame_count, correct_reps, incorrect_reps = await self._run_annotation_pipeline(
+                cap, write_frame, exercise_name, session_id, total_frames, progress_callback,
+                infer_stride=self._inference_stride(fps)
+            )
+            
+            cap.release()
+            mediapipe_service.reset_session(session_id)
+            
+            if proc is not None:
+                logger.info(f"Processed {frame_count} frames, finishing FFmpeg encode...")
+                try:
+                    # Closes stdin and waits for the encoder to flush
+                    _, stderr = await asyncio.to_thread(proc.communicate, timeout=300)
+                except subprocess.TimeoutExpired:
+                    logger.error("FFmpeg timed out after 5 minutes")
+                    raise Exception("FFmpeg processing timed out")
+                
+                if proc.returncode != 0:
+                    logger.error(f"FFmpeg stderr: {stderr.decode(errors='replace')}")
+                    raise Exception(f"FFmpeg failed with code {proc.returncode}")
                 
+                logger.info("FFmpeg completed successfully")
+            else:
                 out.release()
             
-            # Clean up temporary frames
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            
             # Verify output
             if not os.path.exists(output_video_path):
                 raise Exception("Output video was not created")
@@ -683,6 +950,14 @@ class VideoAnnotator:
         except Exception as e:
             logger.error(f"Simple annotation method failed: {e}")
             raise
+        finally:
+            if cap is not None:
+                cap.release()
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            if out is not None:
+                out.release()
 
 # Global instance
 video_annotator = VideoAnnotator()
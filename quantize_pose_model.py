@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Quantize the ONNX pose landmark model to INT8 for faster CPU inference
+Run with: python quantize_pose_model.py models/pose_landmark_full.onnx [models/pose_landmark_full_int8.onnx]
+
+Set POSE_BACKEND=onnx, point POSE_ONNX_MODEL_PATH at the output and set POSE_ONNX_PROVIDERS=CPUExecutionProvider.
+Check rep counts on a few recorded sessions before switching, since INT8 weights can shift landmarks slightly.
+"""
+import sys
+from pathlib import Path
+
+def main():
+    """Dynamically quantize the model weights to INT8"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        print("❌ onnxruntime is not installed (pip install onnxruntime)")
+        sys.exit(1)
+
+    source = Path(sys.argv[1])
+    target = Path(sys.argv[2]) if len(sys.argv) > 2 else source.with_name(f"{source.stem}_int8.onnx")
+
+    if not source.exists():
+        print(f"❌ Model not found: {source}")
+        sys.exit(1)
+
+    print(f"🔧 Quantizing {source} -> {target}")
+    quantize_dynamic(str(source), str(target), weight_type=QuantType.QInt8)
+
+    size_before = source.stat().st_size / (1024 * 1024)
+    size_after = target.stat().st_size / (1024 * 1024)
+    print(f"✅ Done: {size_before:.1f} MB -> {size_after:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """
 Celery worker script for background video processing
-Run with: python celery_worker.py
+Run with: python celery_worker.py [all|video|light]
+
+- video: long-running, memory-heavy video_processing queue (prefetch 1)
+- light: short default/report_generation tasks (large prefetch)
+- all:   every queue in one worker (default)
 """
 import sys
 import os
@@ -12,11 +16,38 @@ sys.path.insert(0, project_root)
 
 from app.services.celery_app import celery_app
 
+# Queue groups and prefetch settings for dedicated workers
+WORKER_PROFILES = {
+    'all': {
+        'queues': 'default,video_processing,report_generation',
+        'prefetch_multiplier': 1,
+    },
+    'video': {
+        'queues': 'video_processing',
+        'prefetch_multiplier': 1,
+        'extra_args': ['--pool=prefork', '-Ofair'],
+    },
+    'light': {
+        'queues': 'default,report_generation',
+        'prefetch_multiplier': 32,
+    },
+}
+
 if __name__ == '__main__':
+    profile_name = sys.argv[1] if len(sys.argv) > 1 else 'all'
+    if profile_name not in WORKER_PROFILES:
+        print(f"Unknown worker profile '{profile_name}'. Choose from: {', '.join(WORKER_PROFILES)}")
+        sys.exit(1)
+
+    profile = WORKER_PROFILES[profile_name]
+
     # Start the Celery worker
     celery_app.worker_main([
         'worker',
         '--loglevel=info',
         '--concurrency=2',
-        '--queues=default,video_processing,report_generation'
-    ])
\ No newline at end of file
+        f"--queues={profile['queues']}",
+        f"--prefetch-multiplier={profile['prefetch_multiplier']}",
+        f"--hostname={profile_name}@%h",
+        *profile.get('extra_args', [])
+    ])
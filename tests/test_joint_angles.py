@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test that the joint angle kernels agree, including on degenerate triplets
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_joint_angles():
+    print("Testing joint angle kernels...")
+    print("=" * 60)
+
+    from app.services.mediapipe_service import _joint_angles, _joint_angles_numpy, _joint_angles_scalar
+
+    points = np.zeros((33, 4))
+    points[11, :3] = (0.0, 0.0, 0.0)  # shoulder
+    points[13, :3] = (1.0, 0.0, 0.0)  # elbow
+    points[15, :3] = (1.0, 1.0, 0.0)  # wrist: right angle at the elbow
+    points[23, :3] = (0.5, 0.5, 0.0)  # hip
+    points[25, :3] = (0.5, 0.5, 0.0)  # knee on top of the hip: degenerate
+    points[27, :3] = (0.5, 1.0, 0.0)  # ankle
+    triplets = np.array([[11, 13, 15], [23, 25, 27]])
+
+    kernels = {'numpy': _joint_angles_numpy, 'scalar': _joint_angles_scalar, 'selected': _joint_angles}
+    ok = True
+    for name, kernel in kernels.items():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            angles = kernel(points, triplets)
+
+        right_angle = np.isclose(angles[0], 90.0)
+        degenerate_nan = np.isnan(angles[1])
+        print(f"{'✅' if right_angle else '❌'} {name}: right angle = {angles[0]:.2f}")
+        print(f"{'✅' if degenerate_nan else '❌'} {name}: degenerate triplet = {angles[1]}")
+        ok = ok and right_angle and degenerate_nan
+
+    return ok
+
+if __name__ == "__main__":
+    success = test_joint_angles()
+
+    print("\n" + "=" * 60)
+    if success:
+        print("✅ Joint angle kernels agree")
+    else:
+        print("❌ Joint angle kernels disagree")
+        sys.exit(1)